@@ -1,22 +1,86 @@
-import sys, random # Importa los módulos sys para interactuar con el intérprete de Python y random para la generación de números aleatorios.
+import os, sys, random, time # Importa los módulos sys para interactuar con el intérprete de Python y random para la generación de números aleatorios.
 
 # Importaciones de PyQt5 para la interfaz gráfica de usuario (GUI):
 from PyQt5.QtWidgets import QMainWindow, QFrame, QDesktopWidget, QApplication, QHBoxLayout, QLabel # Componentes de la ventana y layout.
-from PyQt5.QtCore import Qt, QBasicTimer, pyqtSignal # Core de Qt para eventos y señales.
+from PyQt5.QtCore import Qt, QBasicTimer, QObject, QThread, pyqtSignal, pyqtSlot # Core de Qt para eventos, señales e hilos.
 from PyQt5.QtGui import QPainter, QColor # Herramientas de pintura y color para la GUI.
 
 # Importaciones del modelo de Tetris y la inteligencia artificial
 from tetris_model import BOARD_DATA, Shape  # BOARD_DATA maneja el estado del tablero de juego, Shape define las formas de los tetrominos.
-from tetris_ai import TETRIS_AI # TETRIS_AI es el módulo que implementa la lógica de la inteligencia artificial para el juego.
+from tetris_ai import TetrisAI, decisionKey # TetrisAI es la clase que implementa la lógica de la inteligencia artificial para el juego.
+from tetris_metrics import METRICS # METRICS registra contadores y tiempos cuando se activa con TETRIS_METRICS.
+from tetris_trace import traced # traced registra tramos para el visor de trazas cuando se activa con TETRIS_TRACE.
+from tetris_scheduler import GameClock # GameClock decide cuántas caídas corresponden a cada cuadro.
+from tetris_shm import BoardPublisher # BoardPublisher publica el tablero en memoria compartida cuando se activa con TETRIS_SHM.
+from tetris_render import BoardImage, drawTile # drawTile copia el cuadrado de un color desde una baldosa ya dibujada.
+
+
+# Calcula las jugadas del Agente Inteligente en un hilo aparte, para que la ventana siga avanzando y pintando mientras busca.
+# Cada pedido trae una copia del tablero y el número de pieza, que se devuelve junto con la jugada en moveReady.
+# Después de responder, el hilo aprovecha el tiempo que tarda la pieza en caer para calcular la decisión siguiente
+# (una por cada forma posible de la pieza que aún no se conoce) y la entrega en speculationReady, también con el número
+# de pieza. Si la jugada ya estaba precalculada, la ventana pide solo la decisión siguiente con precompute.
+# timeBudget limita cada decisión a esa cantidad de segundos (None busca en todo el árbol).
+class AIWorker(QObject):
+    moveReady = pyqtSignal(object, int)
+    speculationReady = pyqtSignal(object, int)
 
-class Tetris1(QMainWindow):
-    # Constructor de la clase Tetris1.
     def __init__(self):
+        super().__init__()
+        self.ai = TetrisAI()
+        self.timeBudget = None
+
+    @pyqtSlot(object, int)
+    def compute(self, boardData, pieceNumber):
+        self.ai.boardData = boardData
+        move = self.ai.nextMove(self.timeBudget)
+        self.moveReady.emit(move, pieceNumber)
+        if move:
+            self.speculationReady.emit(self.ai.speculate(move, self.timeBudget), pieceNumber)
+
+    @pyqtSlot(object, object, int)
+    def precompute(self, boardData, move, pieceNumber):
+        self.ai.boardData = boardData
+        self.speculationReady.emit(self.ai.speculate(move, self.timeBudget), pieceNumber)
+
+
+class Tetris1(QMainWindow):
+    aiTimeFraction = 0.5 # Fracción del intervalo del temporizador que puede usar la I.A. para cada decisión.
+    turboTickSeconds = 0.02 # En modo turbo, tiempo de cada tick dedicado a colocar piezas.
+    turboFps = 30 # En modo turbo, repintados por segundo como máximo.
+    requestMove = pyqtSignal(object, int) # Pide al hilo de la I.A. la jugada para una copia del tablero.
+    requestSpeculation = pyqtSignal(object, object, int) # Pide al hilo de la I.A. solo la decisión siguiente a una jugada ya conocida.
+
+    # Constructor de la clase Tetris1. boardData es el tablero de esta ventana (por defecto el global BOARD_DATA).
+    # Con turbo verdadero empieza en modo turbo (ver turboStep). Con clock, la ventana no usa temporizador propio fuera
+    # del modo turbo: la mueve quien la contiene llamando a runSteps (ver tetris.py).
+    def __init__(self, boardData=None, turbo=False, clock=None):
         super().__init__() # Inicializa la clase base QMainWindow.
+        self.boardData = BOARD_DATA if boardData is None else boardData # Tablero de esta ventana.
+        self.sharedClock = clock # Reloj compartido con otras ventanas, o None si la ventana usa el suyo.
+        self.turbo = turbo # Indica si las piezas se colocan directamente, sin caer de a una fila por tick.
+        self.turboAI = TetrisAI(self.boardData) # En modo turbo las jugadas se calculan en este hilo, sobre el propio tablero.
+        self.lastPaint = 0.0 # Momento del último repintado en modo turbo.
         self.isStarted = False # Indica si el juego ha comenzado.
         self.isPaused = False # Indica si el juego está pausado.
         self.nextMove = None # Almacena el siguiente movimiento que se realizará.
         self.lastShape = Shape.shapeNone # Almacena la última forma de tetromino que se jugó.
+        self.pieceNumber = 0 # Número de la pieza actual, para descartar jugadas calculadas para piezas anteriores.
+        self.requestedPiece = -1 # Número de la última pieza cuya jugada se pidió al hilo de la I.A.
+        self.speculatedMoves = {} # Jugadas precalculadas para la próxima pieza, indexadas con decisionKey.
+
+        # Hilo de la I.A.: recibe los pedidos por requestMove y responde con moveReady.
+        self.aiThread = QThread(self)
+        self.aiWorker = AIWorker()
+        self.aiWorker.moveToThread(self.aiThread)
+        self.requestMove.connect(self.aiWorker.compute)
+        self.requestSpeculation.connect(self.aiWorker.precompute)
+        self.aiWorker.moveReady.connect(self.onMoveReady)
+        self.aiWorker.speculationReady.connect(self.onSpeculationReady)
+        self.aiThread.start()
+
+        # Con TETRIS_SHM=prefijo el tablero se publica en el bloque de memoria compartida prefijo-ia.
+        self.publisher = BoardPublisher(os.environ['TETRIS_SHM'] + '-ia') if os.environ.get('TETRIS_SHM') else None
 
         self.initUI() # Llama al método para inicializar la interfaz de usuario.
 
@@ -24,17 +88,20 @@ class Tetris1(QMainWindow):
     def initUI(self):
         self.gridSize = 25 # Tamaño de la cuadrícula del tablero de Tetris.
         self.speed = 250 # Velocidad inicial del juego.
+        self.frameMs = 16 # Intervalo entre cuadros (repintados) en milisegundos.
+        self.clock = self.sharedClock or GameClock(self.speed) # Cantidad de caídas por cuadro, según el tiempo real y el nivel.
+        self.aiWorker.timeBudget = self.clock.getStepMs() * self.aiTimeFraction / 1000.0 # Tiempo máximo por decisión, en segundos.
 
         self.timer = QBasicTimer()  # Temporizador para controlar la velocidad de caída de los tetrominos.
         self.setFocusPolicy(Qt.StrongFocus)  # Establece la política de enfoque para capturar eventos de teclado.
 
         # Crea el tablero de Tetris y lo añade al layout.
         hLayout = QHBoxLayout()
-        self.tboard = Board(self, self.gridSize)
+        self.tboard = Board(self, self.gridSize, self.boardData)
         hLayout.addWidget(self.tboard)
 
         # Crea un panel lateral y lo añade al layout.
-        self.sidePanel1 = SidePanel1(self, self.gridSize)
+        self.sidePanel1 = SidePanel1(self, self.gridSize, self.boardData)
         hLayout.addWidget(self.sidePanel1)
 
         # Barra de estado para mostrar mensajes.
@@ -43,11 +110,12 @@ class Tetris1(QMainWindow):
 
         # Inicia el juego.
         self.start()
-        self.center()  # Centra la ventana en la pantalla.
 
         # Establece el título de la ventana.
         self.setWindowTitle('Agente Inteligente - Alumno: Luis David Fernández - C.I: 22.818.565')
-        self.show() # Muestra la ventana.
+        if not self.sharedClock: # Con reloj compartido, la ventana la muestra quien la contiene.
+            self.center()  # Centra la ventana en la pantalla.
+            self.show() # Muestra la ventana.
 
         # Ajusta el tamaño fijo de la ventana basado en el ancho y alto de los componentes.
         self.setFixedSize(self.tboard.width() + self.sidePanel1.width(),
@@ -70,12 +138,15 @@ class Tetris1(QMainWindow):
 
         self.isStarted = True
         self.tboard.score = 0
-        BOARD_DATA.clear()
+        self.boardData.clear()
 
         self.tboard.msg2Statusbar.emit(str(self.tboard.score))
 
-        BOARD_DATA.createNewPiece()
-        self.timer.start(self.speed, self)
+        self.boardData.createNewPiece()
+        if not self.sharedClock: # El reloj compartido lo maneja Versus; reiniciarlo afectaría al otro tablero.
+            self.clock.setLines(0)
+            self.clock.reset()
+        self.restartTimer()
 
 
     # Esta función alterna entre pausar y reanudar el juego de Tetris. Si el juego está en curso, se detiene el temporizador y se muestra un mensaje de pausa 
@@ -90,49 +161,147 @@ class Tetris1(QMainWindow):
             self.timer.stop()
             self.tboard.msg2Statusbar.emit("Pausa")
         else:
-            self.timer.start(self.speed, self)
+            if not self.sharedClock:
+                self.clock.resync() # El tiempo en pausa no cuenta como atraso.
+            self.restartTimer()
 
         self.updateWindow()
 
     
+    # Intervalo del temporizador en milisegundos: self.frameMs en modo normal y 0 (cada vez que Qt esté libre) en modo turbo.
+    def tickInterval(self):
+        return 0 if self.turbo else self.frameMs
+
+    # Arranca el temporizador propio de la ventana. Con un reloj compartido solo hace falta en modo turbo.
+    def restartTimer(self):
+        if self.sharedClock and not self.turbo:
+            self.timer.stop()
+        else:
+            self.timer.start(self.tickInterval(), self)
+
+    # Activa o desactiva el modo turbo. Se descarta la jugada en curso y las precalculadas, porque el hilo de la I.A. no
+    # conoce las piezas colocadas en modo turbo.
+    def setTurbo(self, turbo):
+        self.turbo = turbo
+        self.nextMove = None
+        self.speculatedMoves = {}
+        self.pieceNumber += 1
+        self.lastShape = self.boardData.currentShape
+        if not self.sharedClock:
+            self.clock.resync() # Las caídas que no se hicieron en modo turbo no cuentan como atraso.
+        if self.isStarted and not self.isPaused:
+            self.restartTimer()
+
+    # Modo turbo: durante turboTickSeconds coloca piezas con la jugada de turboAI, soltándolas directamente con
+    # dropDownAt, y repinta solo si pasó 1 / turboFps segundos desde el último repintado. Al terminar la partida
+    # detiene el temporizador.
+    def turboStep(self):
+        deadline = time.perf_counter() + self.turboTickSeconds
+        while self.boardData.currentShape.shape != Shape.shapeNone and time.perf_counter() < deadline:
+            move = self.turboAI.nextMove()
+            if not move:
+                break
+            lines = self.boardData.dropDownAt(move[0], move[1])
+            METRICS.inc('game.pieces')
+            METRICS.inc('game.lines', lines)
+            self.tboard.score += lines
+        self.lastShape = self.boardData.currentShape
+        gameOver = self.boardData.currentShape.shape == Shape.shapeNone
+        if gameOver:
+            self.timer.stop()
+        now = time.perf_counter()
+        if gameOver or now - self.lastPaint >= 1.0 / self.turboFps:
+            self.lastPaint = now
+            self.updateWindow()
+
     # Esta función actualiza los componentes de la ventana del juego de Tetris, incluyendo el tablero principal y el panel lateral.
+    # Cada componente repinta solo lo que cambió; la ventana en sí no tiene nada que pintar.
     def updateWindow(self):
         self.tboard.updateData()
         self.sidePanel1.updateData()
-        self.update()
+        if self.publisher:
+            self.publisher.publish(self.boardData, self.tboard.score)
 
     
-    # Esta función se ejecuta cada vez que el temporizador del juego emite una señal. Maneja la lógica del juego,
-    # como la caída de las piezas, las rotaciones y los movimientos laterales, y actualiza la ventana del juego.
+    # Esta función se ejecuta cada vez que el temporizador del juego emite una señal. En modo normal ejecuta los pasos
+    # de simulación que indica el reloj (ninguno, uno o varios si el cuadro llegó tarde).
+    @traced('Tetris1.timerEvent')
     def timerEvent(self, event):
         if event.timerId() == self.timer.timerId(): # Verifica si la señal proviene del temporizador del juego.
-            if TETRIS_AI and not self.nextMove: # Si hay una IA de Tetris y no hay un próximo movimiento calculado:
-                self.nextMove = TETRIS_AI.nextMove() # Calcula el próximo movimiento utilizando la IA.
-            if self.nextMove:  # Si hay un próximo movimiento calculado:
-                k = 0
-                while BOARD_DATA.currentDirection != self.nextMove[0] and k < 4:
-                    BOARD_DATA.rotateRight()
-                    k += 1
-                k = 0
-                while BOARD_DATA.currentX != self.nextMove[1] and k < 5:
-                    if BOARD_DATA.currentX > self.nextMove[1]:
-                        BOARD_DATA.moveLeft() # Mueve la pieza hacia la izquierda.
-                    elif BOARD_DATA.currentX < self.nextMove[1]:
-                        BOARD_DATA.moveRight() # Mueve la pieza hacia la derecha.
-                    k += 1
-            lines = BOARD_DATA.moveDown() # Hace que la pieza actual caiga una posición hacia abajo.
-            self.tboard.score += lines # Actualiza la puntuación del juego.
-            if self.lastShape != BOARD_DATA.currentShape: # Si la forma de la pieza cambió:
-                self.nextMove = None # Borra el próximo movimiento calculado.
-                self.lastShape = BOARD_DATA.currentShape # Actualiza la forma de la última pieza jugada.
-            self.updateWindow() # Actualiza la ventana del juego para reflejar los cambios.
+            if self.turbo: # En modo turbo las piezas se colocan directamente.
+                self.turboStep()
+                return
+            steps = self.clock.advance()
+            if steps:
+                self.clock.setLines(self.tboard.score) # La gravedad aumenta con las líneas eliminadas.
+            self.runSteps(steps)
         else:
             super(Tetris1, self).timerEvent(event) # Llama al controlador de temporizador de la clase base.
 
+    # Ejecuta steps pasos de simulación y, si hubo alguno, ajusta el tiempo de la I.A. a la gravedad actual y
+    # actualiza la ventana una sola vez.
+    def runSteps(self, steps):
+        for _ in range(steps):
+            self.step()
+        if steps:
+            self.aiWorker.timeBudget = self.clock.getStepMs() * self.aiTimeFraction / 1000.0
+            self.updateWindow() # Actualiza la ventana del juego para reflejar los cambios.
+
+    # Un paso de simulación: pide la jugada al hilo de la I.A., la aplica y hace caer la pieza una fila.
+    def step(self):
+        if not self.nextMove and self.requestedPiece != self.pieceNumber: # Si aún no se pidió la jugada de esta pieza:
+            self.requestedPiece = self.pieceNumber
+            self.requestMove.emit(self.boardData.snapshot(), self.pieceNumber) # Pide la jugada al hilo de la I.A. sin esperar la respuesta.
+        if self.nextMove:  # Si hay un próximo movimiento calculado:
+            k = 0
+            while self.boardData.currentDirection != self.nextMove[0] and k < 4:
+                self.boardData.rotateRight()
+                k += 1
+            k = 0
+            while self.boardData.currentX != self.nextMove[1] and k < 5:
+                if self.boardData.currentX > self.nextMove[1]:
+                    self.boardData.moveLeft() # Mueve la pieza hacia la izquierda.
+                elif self.boardData.currentX < self.nextMove[1]:
+                    self.boardData.moveRight() # Mueve la pieza hacia la derecha.
+                k += 1
+        lines = self.boardData.moveDown() # Hace que la pieza actual caiga una posición hacia abajo.
+        METRICS.inc('game.ticks')
+        METRICS.inc('game.lines', lines)
+        self.tboard.score += lines # Actualiza la puntuación del juego.
+        if self.lastShape != self.boardData.currentShape: # Si la forma de la pieza cambió:
+            self.nextMove = None # Borra el próximo movimiento calculado.
+            self.lastShape = self.boardData.currentShape # Actualiza la forma de la última pieza jugada.
+            self.pieceNumber += 1
+            # Si la pieza anterior cayó donde se había previsto, la jugada ya está calculada y no hace falta pedirla;
+            # igual se pide al hilo de la I.A. que precalcule la decisión de la pieza siguiente.
+            move = self.speculatedMoves.get(decisionKey(self.boardData))
+            self.speculatedMoves = {}
+            if move:
+                self.nextMove = move
+                self.requestedPiece = self.pieceNumber
+                self.requestSpeculation.emit(self.boardData.snapshot(), move, self.pieceNumber)
+
+    # Recibe la jugada calculada en el hilo de la I.A.; se usa solo si sigue en juego la pieza para la que se pidió.
+    def onMoveReady(self, move, pieceNumber):
+        if pieceNumber == self.pieceNumber:
+            self.nextMove = move
+
+    # Guarda las jugadas precalculadas por el hilo de la I.A. para la próxima pieza, si siguen en juego la pieza y el
+    # tablero para los que se calcularon.
+    def onSpeculationReady(self, moves, pieceNumber):
+        if pieceNumber == self.pieceNumber:
+            self.speculatedMoves = moves
+
+    # Detiene el hilo de la I.A. al cerrar la ventana.
+    def closeEvent(self, event):
+        self.aiThread.quit()
+        self.aiThread.wait()
+        super(Tetris1, self).closeEvent(event)
+
 
     # Esta función responde a las pulsaciones de teclas del agente inteligente durante el juego, permitiendo pausar el juego y controlar las piezas de Tetris.
     def keyPressEvent(self, event):
-        if not self.isStarted or BOARD_DATA.currentShape == Shape.shapeNone:
+        if not self.isStarted or self.boardData.currentShape == Shape.shapeNone:
             super(Tetris1, self).keyPressEvent(event)
             return
 
@@ -141,104 +310,90 @@ class Tetris1(QMainWindow):
         if key == Qt.Key_P:
             self.pause()
             return
+        if key == Qt.Key_T: # Activa o desactiva el modo turbo.
+            self.setTurbo(not self.turbo)
+            return
             
         if self.isPaused:
             return
         elif key == Qt.Key_Left:
-            BOARD_DATA.moveLeft()
+            self.boardData.moveLeft()
         elif key == Qt.Key_Right:
-            BOARD_DATA.moveRight()
+            self.boardData.moveRight()
         elif key == Qt.Key_Up:
-            BOARD_DATA.rotateLeft()
+            self.boardData.rotateLeft()
         elif key == Qt.Key_Space:
-            self.tboard.score += BOARD_DATA.dropDown()
+            lines = self.boardData.dropDown()
+            self.tboard.score += lines
+            METRICS.inc('game.lines', lines)
         else:
             super(Tetris1, self).keyPressEvent(event)
 
         self.updateWindow()
 
 # Las funciones drawSquare y drawSquare1 se utilizan para dibujar un cuadrado en una ubicación específica. El cuadrado se rellena con un color según el valor proporcionado.
-# Se dibujan bordes claros y oscuros para darle una apariencia tridimensional.
+# Se dibujan bordes claros y oscuros para darle una apariencia tridimensional. El cuadrado se copia de una baldosa ya dibujada (ver tetris_render).
 def drawSquare(painter, x, y, val, s):
-    colorTable = [0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
-                  0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00]
-
-    if val == 0:
-        return
-
-    color = QColor(colorTable[val])
-    painter.fillRect(x + 1, y + 1, s - 2, s - 2, color)
-
-    painter.setPen(color.lighter())
-    painter.drawLine(x, y + s - 1, x, y)
-    painter.drawLine(x, y, x + s - 1, y)
-
-    painter.setPen(color.darker())
-    painter.drawLine(x + 1, y + s - 1, x + s - 1, y + s - 1)
-    painter.drawLine(x + s - 1, y + s - 1, x + s - 1, y + 1)
+    drawTile(painter, x, y, val, s)
 
 
 def drawSquare1(painter, x, y, val, s):
-    colorTable = [0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
-                  0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00]
-
-    if val == 0:
-        return
-
-    color = QColor(colorTable[val])
-    painter.fillRect(int(x + 1), int(y + 1), int(s - 2), int(s - 2), color)
-
-    painter.setPen(color.lighter())
-    painter.drawLine(int(x), int(y + s - 1), int(x), int(y))
-    painter.drawLine(int(x), int(y), int(x + s - 1), int(y))
-
-    painter.setPen(color.darker())
-    painter.drawLine(int(x + 1), int(y + s - 1), int(x + s - 1), int(y + s - 1))
-    painter.drawLine(int(x + s - 1), int(y + s - 1), int(x + s - 1), int(y + 1))
+    drawTile(painter, x, y, val, s)
 
 
 # Representa un panel lateral en la interfaz gráfica del juego de Tetris. Este panel muestra la siguiente pieza que aparecerá en el tablero.
 class SidePanel(QFrame):
-    def __init__(self, parent, gridSize):
+    def __init__(self, parent, gridSize, boardData=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * 5, gridSize * BOARD_DATA.height)
-        self.move(gridSize * BOARD_DATA.width, 0)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * 5, gridSize * self.boardData.height)
+        self.move(gridSize * self.boardData.width, 0)
         self.gridSize = gridSize
+        self.shownShape = None # Forma de la pieza siguiente que muestra el panel.
 
+    # Solo repinta el panel cuando cambia la pieza siguiente.
     def updateData(self):
-        self.update()
+        if self.boardData.nextShape.shape != self.shownShape:
+            self.shownShape = self.boardData.nextShape.shape
+            self.update()
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        minX, maxX, minY, maxY = BOARD_DATA.nextShape.getBoundingOffsets(0)
+        minX, maxX, minY, maxY = self.boardData.nextShape.getBoundingOffsets(0)
 
         dy = 3 * self.gridSize
         dx = (self.width() - (maxX - minX) * self.gridSize) / 2
 
-        val = BOARD_DATA.nextShape.shape
-        for x, y in BOARD_DATA.nextShape.getCoords(0, 0, -minY):
+        val = self.boardData.nextShape.shape
+        for x, y in self.boardData.nextShape.getCoords(0, 0, -minY):
             drawSquare(painter, x * self.gridSize + dx, y * self.gridSize + dy, val, self.gridSize)
 
 
 class SidePanel1(QFrame):
-    def __init__(self, parent, gridSize):
+    def __init__(self, parent, gridSize, boardData=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * 5, gridSize * BOARD_DATA.height)
-        self.move(gridSize * BOARD_DATA.width, 0)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * 5, gridSize * self.boardData.height)
+        self.move(gridSize * self.boardData.width, 0)
         self.gridSize = gridSize
+        self.shownShape = None # Forma de la pieza siguiente que muestra el panel.
 
+    # Solo repinta el panel cuando cambia la pieza siguiente.
     def updateData(self):
-        self.update()
+        if self.boardData.nextShape.shape != self.shownShape:
+            self.shownShape = self.boardData.nextShape.shape
+            self.update()
 
+    @traced('SidePanel1.paintEvent')
     def paintEvent(self, event):
         painter = QPainter(self)
-        minX, maxX, minY, maxY = BOARD_DATA.nextShape.getBoundingOffsets(0)
+        minX, maxX, minY, maxY = self.boardData.nextShape.getBoundingOffsets(0)
 
         dy = 3 * self.gridSize
         dx = (self.width() - (maxX - minX) * self.gridSize) / 2
 
-        val = BOARD_DATA.nextShape.shape
-        for x, y in BOARD_DATA.nextShape.getCoords(0, 0, -minY):
+        val = self.boardData.nextShape.shape
+        for x, y in self.boardData.nextShape.getCoords(0, 0, -minY):
             drawSquare1(painter, x * self.gridSize + dx, y * self.gridSize + dy, val, self.gridSize)
 
 
@@ -248,28 +403,57 @@ class Board(QFrame):
     msg2Statusbar = pyqtSignal(str)
     speed = 10
 
-    def __init__(self, parent, gridSize):
+    # renderer 'image' pinta el tablero como una sola imagen escalada (BoardImage) en lugar de baldosa por baldosa;
+    # por defecto se toma de la variable de entorno TETRIS_RENDER.
+    def __init__(self, parent, gridSize, boardData=None, renderer=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * BOARD_DATA.width, gridSize * BOARD_DATA.height)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * self.boardData.width, gridSize * self.boardData.height)
         self.gridSize = gridSize
+        renderer = renderer or os.environ.get('TETRIS_RENDER', 'tiles')
+        self.boardImage = None
+        if renderer == 'image':
+            background = self.palette().window().color().rgb() & 0xFFFFFF
+            self.boardImage = BoardImage(self.boardData.width, self.boardData.height, background)
         self.initBoard()
 
     def initBoard(self):
         self.score = 0
-        BOARD_DATA.clear()
+        self.boardData.clear()
 
+    @traced('Board.paintEvent')
     def paintEvent(self, event):
+        with METRICS.time('render.paintMs'):
+            self.paintBoard(event.rect())
+
+    # Pinta solo las celdas que tocan rect (por defecto, todo el tablero); el fondo del resto de la zona lo borra Qt.
+    def paintBoard(self, rect=None):
         painter = QPainter(self)
+        if self.boardImage is not None:
+            self.boardImage.update(self.boardData)
+            self.boardImage.draw(painter, self.gridSize)
+            self.drawBorder(painter)
+            return
+        if rect is None:
+            rect = self.rect()
+        left = max(0, rect.left() // self.gridSize)
+        right = min(self.boardData.width - 1, rect.right() // self.gridSize)
+        top = max(0, rect.top() // self.gridSize)
+        bottom = min(self.boardData.height - 1, rect.bottom() // self.gridSize)
+
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                val = self.boardData.getValue(x, y)
+                drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
-        for x in range(BOARD_DATA.width):
-            for y in range(BOARD_DATA.height):
-                val = BOARD_DATA.getValue(x, y)
+        for x, y in self.boardData.getCurrentShapeCoord():
+            if left <= x <= right and top <= y <= bottom:
+                val = self.boardData.currentShape.shape
                 drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
-        for x, y in BOARD_DATA.getCurrentShapeCoord():
-            val = BOARD_DATA.currentShape.shape
-            drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
+        self.drawBorder(painter)
 
+    def drawBorder(self, painter):
         painter.setPen(QColor(0x777777))
         painter.drawLine(self.width()-1, 0, self.width()-1, self.height())
         painter.setPen(QColor(0xCCCCCC))
@@ -277,33 +461,43 @@ class Board(QFrame):
 
     def updateData(self):
         self.msg2Statusbar.emit("Nro. de Líneas IA: " + str(self.score) + " | Puntos Acumulados IA: " + str(self.score * 100))
-        self.update()
+        self.updateRegion()
+
+    # Repinta solo las zonas del tablero que cambiaron desde el cuadro anterior (todo, la primera vez).
+    def updateRegion(self):
+        region = self.boardData.takeDirtyRegion()
+        if region is None:
+            self.update()
+            return
+        for x, y, w, h in region:
+            self.update(x * self.gridSize, y * self.gridSize, w * self.gridSize, h * self.gridSize)
 
 
 class Board1(QFrame):
     msg2Statusbar = pyqtSignal(str)
     speed = 10
 
-    def __init__(self, parent, gridSize):
+    def __init__(self, parent, gridSize, boardData=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * BOARD_DATA.width, gridSize * BOARD_DATA.height)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * self.boardData.width, gridSize * self.boardData.height)
         self.gridSize = gridSize
         self.initBoard1()
 
     def initBoard(self):
         self.score = 0
-        BOARD_DATA.clear()
+        self.boardData.clear()
 
     def paintEvent(self, event):
         painter = QPainter(self)
 
-        for x in range(BOARD_DATA.width):
-            for y in range(BOARD_DATA.height):
-                val = BOARD_DATA.getValue(x, y)
+        for x in range(self.boardData.width):
+            for y in range(self.boardData.height):
+                val = self.boardData.getValue(x, y)
                 drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
-        for x, y in BOARD_DATA.getCurrentShapeCoord():
-            val = BOARD_DATA.currentShape.shape
+        for x, y in self.boardData.getCurrentShapeCoord():
+            val = self.boardData.currentShape.shape
             drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
         painter.setPen(QColor(0x777777))
@@ -318,5 +512,5 @@ class Board1(QFrame):
 # Crea una instancia de la aplicación PyQt5, inicializa el juego de Tetris (Tetris1) y comienza la ejecución de la aplicación.
 if __name__ == '__main__':
     app = QApplication([])
-    tetris1 = Tetris1()
+    tetris1 = Tetris1(turbo='--turbo' in sys.argv[1:]) # python ai.py --turbo empieza en modo turbo.
     sys.exit(app.exec_())
\ No newline at end of file
@@ -1,4 +1,4 @@
-import sys, random # Importa los módulos sys para interactuar con el intérprete de Python y random para la generación de números aleatorios.
+import os, sys, random # Importa los módulos sys para interactuar con el intérprete de Python y random para la generación de números aleatorios.
 
 # Importaciones de PyQt5 para la interfaz gráfica de usuario (GUI):
 from PyQt5.QtWidgets import QMainWindow, QFrame, QDesktopWidget, QApplication, QHBoxLayout, QLabel # Componentes de la ventana y layout.
@@ -7,33 +7,45 @@ from PyQt5.QtGui import QPainter, QColor # Herramientas de pintura y color para
 
 # Importación del modelo de Tetris
 from tetris_model import BOARD_DATA, Shape # BOARD_DATA maneja el estado del tablero de juego, Shape define las formas de los tetrominos.
+from tetris_metrics import METRICS # METRICS registra contadores y tiempos cuando se activa con TETRIS_METRICS.
+from tetris_scheduler import GameClock # GameClock decide cuántas caídas corresponden a cada cuadro.
+from tetris_shm import BoardPublisher # BoardPublisher publica el tablero en memoria compartida cuando se activa con TETRIS_SHM.
+from tetris_render import BoardImage, drawTile # drawTile copia el cuadrado de un color desde una baldosa ya dibujada.
 
 class Tetris(QMainWindow):
-    # Constructor de la clase Tetris.
-    def __init__(self):
+    # Constructor de la clase Tetris. boardData es el tablero de esta ventana (por defecto el global BOARD_DATA).
+    # Con clock, la ventana no usa temporizador propio: la mueve quien la contiene llamando a runSteps (ver tetris.py).
+    def __init__(self, boardData=None, clock=None):
         super().__init__() # Inicializa la clase base QMainWindow.
+        self.boardData = BOARD_DATA if boardData is None else boardData # Tablero de esta ventana.
+        self.sharedClock = clock # Reloj compartido con otras ventanas, o None si la ventana usa el suyo.
         self.isStarted = False # Indica si el juego ha comenzado.
         self.isPaused = False # Indica si el juego está pausado.
         self.nextMove = None # Almacena el siguiente movimiento que se realizará.
         self.lastShape = Shape.shapeNone # Almacena la última forma de tetromino que se jugó.
 
+        # Con TETRIS_SHM=prefijo el tablero se publica en el bloque de memoria compartida prefijo-humano.
+        self.publisher = BoardPublisher(os.environ['TETRIS_SHM'] + '-humano') if os.environ.get('TETRIS_SHM') else None
+
         self.initUI() # Llama al método para inicializar la interfaz de usuario.
 
     # Definimos la configuración inicial de la interfaz de usuario (UI).
     def initUI(self):
         self.gridSize = 25 # Tamaño de la cuadrícula del tablero de Tetris.
         self.speed = 250 # Velocidad inicial del juego.
+        self.frameMs = 16 # Intervalo entre cuadros (repintados) en milisegundos.
+        self.clock = self.sharedClock or GameClock(self.speed) # Cantidad de caídas por cuadro, según el tiempo real y el nivel.
 
         self.timer = QBasicTimer()  # Temporizador para controlar la velocidad de caída de los tetrominos.
         self.setFocusPolicy(Qt.StrongFocus) # Establece la política de enfoque para capturar eventos de teclado.
 
         # Crea el tablero de Tetris y lo añade al layout.
         hLayout = QHBoxLayout()
-        self.tboard = Board(self, self.gridSize)
+        self.tboard = Board(self, self.gridSize, self.boardData)
         hLayout.addWidget(self.tboard)
 
         # Crea un panel lateral y lo añade al layout.
-        self.sidePanel = SidePanel(self, self.gridSize)
+        self.sidePanel = SidePanel(self, self.gridSize, self.boardData)
         hLayout.addWidget(self.sidePanel)
 
         # Barra de estado para mostrar mensajes.
@@ -42,9 +54,10 @@ class Tetris(QMainWindow):
 
         self.start() # Inicia el juego.
 
-        self.center() # Centra la ventana en la pantalla.
         self.setWindowTitle('Jugador Humano - Alumno: Luis David Fernández - C.I: 22.818.565') # Establece el título de la ventana.
-        self.show() # Muestra la ventana.
+        if not self.sharedClock: # Con reloj compartido, la ventana la muestra quien la contiene.
+            self.center() # Centra la ventana en la pantalla.
+            self.show() # Muestra la ventana.
 
         # Ajusta el tamaño fijo de la ventana basado en el ancho y alto de los componentes.
         self.setFixedSize(self.tboard.width() + self.sidePanel.width(),
@@ -65,12 +78,15 @@ class Tetris(QMainWindow):
 
         self.isStarted = True
         self.tboard.score = 0
-        BOARD_DATA.clear()
+        self.boardData.clear()
 
         self.tboard.msg2Statusbar.emit(str(self.tboard.score))
 
-        BOARD_DATA.createNewPiece()
-        self.timer.start(self.speed, self)
+        self.boardData.createNewPiece()
+        if not self.sharedClock: # El reloj compartido lo maneja Versus; reiniciarlo afectaría al otro tablero.
+            self.clock.setLines(0)
+            self.clock.reset()
+        self.restartTimer()
 
 
     # Esta función alterna entre pausar y reanudar el juego de Tetris. Si el juego está en curso, se detiene el temporizador y se muestra un mensaje de pausa 
@@ -85,45 +101,71 @@ class Tetris(QMainWindow):
             self.timer.stop()
             self.tboard.msg2Statusbar.emit("Pausa")
         else:
-            self.timer.start(self.speed, self)
+            if not self.sharedClock:
+                self.clock.resync() # El tiempo en pausa no cuenta como atraso.
+            self.restartTimer()
 
         self.updateWindow()
 
     # Esta función actualiza los componentes de la ventana del juego de Tetris, incluyendo el tablero principal y el panel lateral.
+    # Cada componente repinta solo lo que cambió; la ventana en sí no tiene nada que pintar.
     def updateWindow(self):
         self.tboard.updateData()
         self.sidePanel.updateData()
-        self.update()
+        if self.publisher:
+            self.publisher.publish(self.boardData, self.tboard.score)
 
-    # Esta función se ejecuta cada vez que el temporizador del juego emite una señal. Maneja la lógica del juego,
-    # como la caída de las piezas, las rotaciones y los movimientos laterales, y actualiza la ventana del juego.
+    # Arranca el temporizador propio de la ventana, salvo que la mueva un reloj compartido.
+    def restartTimer(self):
+        if self.sharedClock:
+            self.timer.stop()
+        else:
+            self.timer.start(self.frameMs, self)
+
+    # Esta función se ejecuta en cada cuadro del temporizador del juego. Ejecuta los pasos de simulación que indica
+    # el reloj (ninguno, uno o varios si el cuadro llegó tarde).
     def timerEvent(self, event):
         if event.timerId() == self.timer.timerId():
-            if self.nextMove:
-                k = 0
-                while BOARD_DATA.currentDirection != self.nextMove[0] and k < 4:
-                    BOARD_DATA.rotateRight() # Rota la pieza hacia la derecha.
-                    k += 1
-                k = 0
-                while BOARD_DATA.currentX != self.nextMove[1] and k < 5:
-                    if BOARD_DATA.currentX > self.nextMove[1]:
-                        BOARD_DATA.moveLeft() # Mueve la pieza hacia la izquierda.
-                    elif BOARD_DATA.currentX < self.nextMove[1]:
-                        BOARD_DATA.moveRight() # Mueve la pieza hacia la derecha.
-                    k += 1
-            lines = BOARD_DATA.moveDown() # Hace que la pieza actual caiga una posición hacia abajo.
-            self.tboard.score += lines
-            if self.lastShape != BOARD_DATA.currentShape:
-                self.nextMove = None
-                self.lastShape = BOARD_DATA.currentShape
-            self.updateWindow() # Actualiza la ventana del juego para reflejar los cambios.
+            steps = self.clock.advance()
+            self.runSteps(steps)
+            if steps:
+                self.clock.setLines(self.tboard.score) # La gravedad aumenta con las líneas eliminadas.
         else:
             super(Tetris, self).timerEvent(event) # Llama al controlador de temporizador de la clase base.
 
+    # Ejecuta steps pasos de simulación y, si hubo alguno, actualiza la ventana una sola vez.
+    def runSteps(self, steps):
+        for _ in range(steps):
+            self.step()
+        if steps:
+            self.updateWindow() # Actualiza la ventana del juego para reflejar los cambios.
+
+    # Un paso de simulación: maneja la caída de las piezas, las rotaciones y los movimientos laterales.
+    def step(self):
+        if self.nextMove:
+            k = 0
+            while self.boardData.currentDirection != self.nextMove[0] and k < 4:
+                self.boardData.rotateRight() # Rota la pieza hacia la derecha.
+                k += 1
+            k = 0
+            while self.boardData.currentX != self.nextMove[1] and k < 5:
+                if self.boardData.currentX > self.nextMove[1]:
+                    self.boardData.moveLeft() # Mueve la pieza hacia la izquierda.
+                elif self.boardData.currentX < self.nextMove[1]:
+                    self.boardData.moveRight() # Mueve la pieza hacia la derecha.
+                k += 1
+        lines = self.boardData.moveDown() # Hace que la pieza actual caiga una posición hacia abajo.
+        METRICS.inc('game.ticks')
+        METRICS.inc('game.lines', lines)
+        self.tboard.score += lines
+        if self.lastShape != self.boardData.currentShape:
+            self.nextMove = None
+            self.lastShape = self.boardData.currentShape
+
 
     # Esta función responde a las pulsaciones de teclas del Humano durante el juego, permitiendo pausar el juego y controlar las piezas de Tetris.
     def keyPressEvent(self, event):
-        if not self.isStarted or BOARD_DATA.currentShape == Shape.shapeNone:
+        if not self.isStarted or self.boardData.currentShape == Shape.shapeNone:
             super(Tetris, self).keyPressEvent(event)
             return
 
@@ -136,13 +178,15 @@ class Tetris(QMainWindow):
         if self.isPaused:
             return
         elif key == Qt.Key_Left:
-            BOARD_DATA.moveLeft()
+            self.boardData.moveLeft()
         elif key == Qt.Key_Right:
-            BOARD_DATA.moveRight()
+            self.boardData.moveRight()
         elif key == Qt.Key_Up:
-            BOARD_DATA.rotateLeft()
+            self.boardData.rotateLeft()
         elif key == Qt.Key_Space:
-            self.tboard.score += BOARD_DATA.dropDown()
+            lines = self.boardData.dropDown()
+            self.tboard.score += lines
+            METRICS.inc('game.lines', lines)
         else:
             super(Tetris, self).keyPressEvent(event)
 
@@ -150,87 +194,67 @@ class Tetris(QMainWindow):
 
 
 # Las funciones drawSquare y drawSquare1 se utilizan para dibujar un cuadrado en una ubicación específica. El cuadrado se rellena con un color según el valor proporcionado.
-# Se dibujan bordes claros y oscuros para darle una apariencia tridimensional.
+# Se dibujan bordes claros y oscuros para darle una apariencia tridimensional. El cuadrado se copia de una baldosa ya dibujada (ver tetris_render).
 def drawSquare(painter, x, y, val, s):
-    colorTable = [0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
-                  0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00]
-
-    if val == 0:
-        return
-
-    color = QColor(colorTable[val])
-    painter.fillRect(int(x + 1), int(y + 1), int(s - 2), int(s - 2), color)
-
-    painter.setPen(color.lighter())
-    painter.drawLine(int(x), int(y + s - 1), int(x), int(y))
-    painter.drawLine(int(x), int(y), int(x + s - 1), int(y))
-
-    painter.setPen(color.darker())
-    painter.drawLine(int(x + 1), int(y + s - 1), int(x + s - 1), int(y + s - 1))
-    painter.drawLine(int(x + s - 1), int(y + s - 1), int(x + s - 1), int(y + 1))
+    drawTile(painter, x, y, val, s)
 
 
 def drawSquare1(painter, x, y, val, s):
-    colorTable = [0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
-                  0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00]
-
-    if val == 0:
-        return
-
-    color = QColor(colorTable[val])
-    painter.fillRect(int(x + 1), int(y + 1), int(s - 2), int(s - 2), color)
-
-    painter.setPen(color.lighter())
-    painter.drawLine(int(x), int(y + s - 1), int(x), int(y))
-    painter.drawLine(int(x), int(y), int(x + s - 1), int(y))
-
-    painter.setPen(color.darker())
-    painter.drawLine(int(x + 1), int(y + s - 1), int(x + s - 1), int(y + s - 1))
-    painter.drawLine(int(x + s - 1), int(y + s - 1), int(x + s - 1), int(y + 1))
+    drawTile(painter, x, y, val, s)
 
 
 # Representa un panel lateral en la interfaz gráfica del juego de Tetris. Este panel muestra la siguiente pieza que aparecerá en el tablero.
 class SidePanel(QFrame):
-    def __init__(self, parent, gridSize):
+    def __init__(self, parent, gridSize, boardData=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * 5, gridSize * BOARD_DATA.height)
-        self.move(gridSize * BOARD_DATA.width, 0)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * 5, gridSize * self.boardData.height)
+        self.move(gridSize * self.boardData.width, 0)
         self.gridSize = gridSize
+        self.shownShape = None # Forma de la pieza siguiente que muestra el panel.
 
+    # Solo repinta el panel cuando cambia la pieza siguiente.
     def updateData(self):
-        self.update()
+        if self.boardData.nextShape.shape != self.shownShape:
+            self.shownShape = self.boardData.nextShape.shape
+            self.update()
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        minX, maxX, minY, maxY = BOARD_DATA.nextShape.getBoundingOffsets(0)
+        minX, maxX, minY, maxY = self.boardData.nextShape.getBoundingOffsets(0)
 
         dy = 3 * self.gridSize
         dx = (self.width() - (maxX - minX) * self.gridSize) / 2
 
-        val = BOARD_DATA.nextShape.shape
-        for x, y in BOARD_DATA.nextShape.getCoords(0, 0, -minY):
+        val = self.boardData.nextShape.shape
+        for x, y in self.boardData.nextShape.getCoords(0, 0, -minY):
             drawSquare(painter, x * self.gridSize + dx, y * self.gridSize + dy, val, self.gridSize)
 
 
 class SidePanel1(QFrame):
-    def __init__(self, parent, gridSize):
+    def __init__(self, parent, gridSize, boardData=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * 5, gridSize * BOARD_DATA.height)
-        self.move(gridSize * BOARD_DATA.width, 0)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * 5, gridSize * self.boardData.height)
+        self.move(gridSize * self.boardData.width, 0)
         self.gridSize = gridSize
+        self.shownShape = None # Forma de la pieza siguiente que muestra el panel.
 
+    # Solo repinta el panel cuando cambia la pieza siguiente.
     def updateData(self):
-        self.update()
+        if self.boardData.nextShape.shape != self.shownShape:
+            self.shownShape = self.boardData.nextShape.shape
+            self.update()
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        minX, maxX, minY, maxY = BOARD_DATA.nextShape.getBoundingOffsets(0)
+        minX, maxX, minY, maxY = self.boardData.nextShape.getBoundingOffsets(0)
 
         dy = 3 * self.gridSize
         dx = (self.width() - (maxX - minX) * self.gridSize) / 2
 
-        val = BOARD_DATA.nextShape.shape
-        for x, y in BOARD_DATA.nextShape.getCoords(0, 0, -minY):
+        val = self.boardData.nextShape.shape
+        for x, y in self.boardData.nextShape.getCoords(0, 0, -minY):
             drawSquare1(painter, x * self.gridSize + dx, y * self.gridSize + dy, val, self.gridSize)
 
 
@@ -240,28 +264,56 @@ class Board(QFrame):
     msg2Statusbar = pyqtSignal(str)
     speed = 10
 
-    def __init__(self, parent, gridSize):
+    # renderer 'image' pinta el tablero como una sola imagen escalada (BoardImage) en lugar de baldosa por baldosa;
+    # por defecto se toma de la variable de entorno TETRIS_RENDER.
+    def __init__(self, parent, gridSize, boardData=None, renderer=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * BOARD_DATA.width, gridSize * BOARD_DATA.height)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * self.boardData.width, gridSize * self.boardData.height)
         self.gridSize = gridSize
+        renderer = renderer or os.environ.get('TETRIS_RENDER', 'tiles')
+        self.boardImage = None
+        if renderer == 'image':
+            background = self.palette().window().color().rgb() & 0xFFFFFF
+            self.boardImage = BoardImage(self.boardData.width, self.boardData.height, background)
         self.initBoard()
 
     def initBoard(self):
         self.score = 0
-        BOARD_DATA.clear()
+        self.boardData.clear()
 
     def paintEvent(self, event):
+        with METRICS.time('render.paintMs'):
+            self.paintBoard(event.rect())
+
+    # Pinta solo las celdas que tocan rect (por defecto, todo el tablero); el fondo del resto de la zona lo borra Qt.
+    def paintBoard(self, rect=None):
         painter = QPainter(self)
+        if self.boardImage is not None:
+            self.boardImage.update(self.boardData)
+            self.boardImage.draw(painter, self.gridSize)
+            self.drawBorder(painter)
+            return
+        if rect is None:
+            rect = self.rect()
+        left = max(0, rect.left() // self.gridSize)
+        right = min(self.boardData.width - 1, rect.right() // self.gridSize)
+        top = max(0, rect.top() // self.gridSize)
+        bottom = min(self.boardData.height - 1, rect.bottom() // self.gridSize)
+
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                val = self.boardData.getValue(x, y)
+                drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
-        for x in range(BOARD_DATA.width):
-            for y in range(BOARD_DATA.height):
-                val = BOARD_DATA.getValue(x, y)
+        for x, y in self.boardData.getCurrentShapeCoord():
+            if left <= x <= right and top <= y <= bottom:
+                val = self.boardData.currentShape.shape
                 drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
-        for x, y in BOARD_DATA.getCurrentShapeCoord():
-            val = BOARD_DATA.currentShape.shape
-            drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
+        self.drawBorder(painter)
 
+    def drawBorder(self, painter):
         painter.setPen(QColor(0x777777))
         painter.drawLine(self.width()-1, 0, self.width()-1, self.height())
         painter.setPen(QColor(0xCCCCCC))
@@ -269,33 +321,43 @@ class Board(QFrame):
 
     def updateData(self):
         self.msg2Statusbar.emit("Nro. de Líneas: " + str(self.score) + " | Puntos Acumulados: " + str(self.score * 100))
-        self.update()
+        self.updateRegion()
+
+    # Repinta solo las zonas del tablero que cambiaron desde el cuadro anterior (todo, la primera vez).
+    def updateRegion(self):
+        region = self.boardData.takeDirtyRegion()
+        if region is None:
+            self.update()
+            return
+        for x, y, w, h in region:
+            self.update(x * self.gridSize, y * self.gridSize, w * self.gridSize, h * self.gridSize)
 
 
 class Board1(QFrame):
     msg2Statusbar = pyqtSignal(str)
     speed = 10
 
-    def __init__(self, parent, gridSize):
+    def __init__(self, parent, gridSize, boardData=None):
         super().__init__(parent)
-        self.setFixedSize(gridSize * BOARD_DATA.width, gridSize * BOARD_DATA.height)
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.setFixedSize(gridSize * self.boardData.width, gridSize * self.boardData.height)
         self.gridSize = gridSize
         self.initBoard1()
 
     def initBoard(self):
         self.score = 0
-        BOARD_DATA.clear()
+        self.boardData.clear()
 
     def paintEvent(self, event):
         painter = QPainter(self)
 
-        for x in range(BOARD_DATA.width):
-            for y in range(BOARD_DATA.height):
-                val = BOARD_DATA.getValue(x, y)
+        for x in range(self.boardData.width):
+            for y in range(self.boardData.height):
+                val = self.boardData.getValue(x, y)
                 drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
-        for x, y in BOARD_DATA.getCurrentShapeCoord():
-            val = BOARD_DATA.currentShape.shape
+        for x, y in self.boardData.getCurrentShapeCoord():
+            val = self.boardData.currentShape.shape
             drawSquare(painter, x * self.gridSize, y * self.gridSize, val, self.gridSize)
 
         painter.setPen(QColor(0x777777))
@@ -0,0 +1,60 @@
+import random
+import types
+
+import numpy as np
+
+import tetris_ai
+from tetris_ai import TetrisAI, calcColumnHeights, clearRows, placeOnRows
+from tetris_bench import makeBoard
+from tetris_model import BoardData
+
+
+# calculateScores debe dar exactamente las mismas puntuaciones que calculateScore para todas las jugadas de dos piezas
+# sobre tableros reproducibles a media partida.
+def test_calculateScoresMatchesCalculateScore():
+    for seed in range(3):
+        boardData = makeBoard(seed, maxHeight=8)
+        ai = TetrisAI(boardData, cacheSize=0)
+        nextShape = boardData.nextShape
+        boards, expected = [], []
+        for d0 in boardData.currentShape.getRotations():
+            minX, maxX, _, _ = boardData.currentShape.getBoundingOffsets(d0)
+            for x0 in range(-minX, BoardData.width - maxX):
+                step1Board, columnHeights = ai.calcStep1Board(d0, x0)
+                for d1 in nextShape.getRotations():
+                    minX1, maxX1, minY1, _ = nextShape.getBoundingOffsets(d1)
+                    dropDist = ai.calcNextDropDist(columnHeights, d1, range(-minX1, BoardData.width - maxX1))
+                    for x1 in range(-minX1, BoardData.width - maxX1):
+                        if dropDist[x1] + minY1 < 0:  # La pieza no cabe.
+                            continue
+                        board = np.copy(step1Board)
+                        expected.append(ai.calculateScore(board, d1, x1, dropDist))
+                        boards.append(board)
+        assert boards
+        assert ai.calculateScores(np.array(boards)).tolist() == expected
+
+
+# Si el plazo vence en el último nivel de beamSearch, el haz guardado para la decisión siguiente debe descender de la
+# jugada elegida y cada nodo debe tener una jugada por cada pieza de reusedShapes.
+def test_beamSearchDeadlineOnLastLevel(monkeypatch):
+    boardData = BoardData(random.Random(7), previewSize=1)
+    boardData.createNewPiece()
+    for _ in range(6):
+        boardData.dropDown()
+    ai = TetrisAI(boardData, cacheSize=0)
+
+    times = iter([0.0] + [1.0] * 10)  # El plazo se cumple al revisarlo por segunda vez (en el nivel 2).
+    monkeypatch.setattr(tetris_ai, 'time', types.SimpleNamespace(perf_counter=lambda: next(times)))
+    strategy = ai.beamSearch(2, 4, deadline=0.5)
+
+    assert strategy is not None
+    assert ai.reusedBeam is not None
+    rows, reusedShapes, nodes = ai.reusedBeam
+    expected, _ = clearRows(placeOnRows(tuple(boardData.rowMasks), calcColumnHeights(boardData.rowMasks),
+                                        boardData.currentShape, strategy[0], strategy[1]))
+    assert rows == expected
+    shape = boardData.preview[0]
+    for nodeRows, moves, _ in nodes:
+        assert len(moves) == len(reusedShapes)
+        placed = placeOnRows(rows, calcColumnHeights(rows), shape, moves[0][0], moves[0][1])
+        assert clearRows(placed)[0] == nodeRows
@@ -0,0 +1,61 @@
+import random
+
+from tetris_bench import makeBoard, makeBoardWithLines
+from tetris_model import BoardData, Shape, calcColumnHeights
+
+
+def boardState(boardData):
+    return (boardData.backBoard[:], boardData.rowMasks[:], boardData.columnHeights[:], boardData.columnBlocks[:],
+            boardData.rowFill[:])
+
+
+# Recalcula desde backBoard las estructuras que BoardData mantiene al colocar piezas y comprueba que coinciden.
+def assertConsistent(boardData):
+    width, height = BoardData.width, BoardData.height
+    filled = [[boardData.backBoard[x + y * width] != 0 for x in range(width)] for y in range(height)]
+    rowMasks = [sum(1 << x for x in range(width) if filled[y][x]) for y in range(height)]
+    assert boardData.rowMasks == rowMasks
+    assert boardData.rowFill == [sum(row) for row in filled]
+    assert boardData.columnBlocks == [sum(filled[y][x] for y in range(height)) for x in range(width)]
+    assert boardData.columnHeights == calcColumnHeights(rowMasks)
+
+
+# Secuencias al azar de placePiece (con y sin eliminar líneas) deshechas en orden inverso con undoPiece deben dejar
+# backBoard, rowMasks, columnHeights, columnBlocks y rowFill como estaban, y ser coherentes en cada paso.
+def test_placeAndUndoRestoreBoard():
+    rng = random.Random(0)
+    for seed in range(300):
+        boardData = makeBoardWithLines(seed) if seed % 2 else makeBoard(seed, maxHeight=rng.randint(0, 14))
+        assertConsistent(boardData)
+        initial = boardState(boardData)
+        records = []
+        for _ in range(rng.randint(1, 6)):
+            shape = Shape(rng.randint(1, 7))
+            direction = rng.choice(shape.getRotations())
+            minX, maxX, _, _ = shape.getBoundingOffsets(direction)
+            before = boardState(boardData)
+            record = boardData.placePiece(shape, direction, rng.randint(-minX, BoardData.width - 1 - maxX),
+                                          clearLines=rng.random() < 0.5)
+            if record is None:
+                assert boardState(boardData) == before
+                continue
+            assertConsistent(boardData)
+            records.append(record)
+        for record in reversed(records):
+            boardData.undoPiece(record)
+            assertConsistent(boardData)
+        assert boardState(boardData) == initial
+
+
+# Después del fin del juego la ventana sigue llamando a moveDown en cada tick; no debe fallar ni cambiar el tablero.
+def test_moveDownAfterGameOver():
+    boardData = BoardData(random.Random(1))
+    boardData.createNewPiece()
+    while boardData.currentShape.shape != Shape.shapeNone:
+        boardData.dropDown()
+    backBoard = boardData.backBoard[:]
+    rowMasks = boardData.rowMasks[:]
+    for _ in range(3):
+        assert boardData.moveDown() == 0
+    assert boardData.backBoard == backBoard
+    assert boardData.rowMasks == rowMasks
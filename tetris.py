@@ -1,8 +1,72 @@
-# Este modulo nos permitirá ejecutar los procesos secundarios de los archivos humano.py y ai.py
-import subprocess
+# Modo versus: el tablero del jugador humano y el del Agente Inteligente en una misma ventana y un mismo proceso.
+# Antes se lanzaban humano.py y ai.py como dos procesos (dos intérpretes, dos copias de Qt y de numpy) sin ninguna
+# coordinación; ahora un solo GameClock marca las caídas de ambos tableros, que avanzan a la par. Los dos tableros
+# reciben la misma secuencia de piezas (la misma semilla) para que la comparación sea justa.
+#   python tetris.py [--seed N]
+import argparse
+import random
+import sys
 
-# Ejecuta humano.py
-subprocess.Popen(['python', 'humano.py'])
+from PyQt5.QtWidgets import QApplication, QHBoxLayout, QWidget
+from PyQt5.QtCore import QBasicTimer
 
-# Ejecuta ai.py
-subprocess.Popen(['python', 'ai.py'])
\ No newline at end of file
+import ai
+import humano
+from tetris_model import BoardData
+from tetris_scheduler import GameClock
+
+
+class Versus(QWidget):
+    def __init__(self, seed=None):
+        super().__init__()
+        if seed is None:
+            seed = random.randrange(1 << 30)
+        self.seed = seed
+        self.speed = 250 # Velocidad inicial del juego.
+        self.frameMs = 16 # Intervalo entre cuadros (repintados) en milisegundos.
+        self.clock = GameClock(self.speed) # Reloj compartido por los dos tableros.
+
+        self.human = humano.Tetris(BoardData(random.Random(seed)), clock=self.clock)
+        self.ai = ai.Tetris1(BoardData(random.Random(seed)), clock=self.clock)
+
+        hLayout = QHBoxLayout()
+        hLayout.addWidget(self.human)
+        hLayout.addWidget(self.ai)
+        self.setLayout(hLayout)
+
+        self.setWindowTitle('Jugador Humano vs. Agente Inteligente')
+        self.timer = QBasicTimer()
+        self.clock.reset()
+        self.timer.start(self.frameMs, self)
+        self.show()
+        self.human.setFocus() # Las flechas mueven la pieza del jugador humano.
+
+    # En cada cuadro ejecuta en los dos tableros los mismos pasos de simulación. Un tablero en pausa (o la I.A. en modo
+    # turbo, que tiene su propio temporizador) no avanza. La gravedad la marca el tablero con más líneas.
+    def timerEvent(self, event):
+        if event.timerId() == self.timer.timerId():
+            steps = self.clock.advance()
+            if steps:
+                for window in (self.human, self.ai):
+                    if window.isStarted and not window.isPaused and not getattr(window, 'turbo', False):
+                        window.runSteps(steps)
+                self.clock.setLines(max(self.human.tboard.score, self.ai.tboard.score))
+        else:
+            super(Versus, self).timerEvent(event)
+
+    # Cierra las dos partidas; la de la I.A. detiene su hilo.
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.ai.close()
+        self.human.close()
+        super(Versus, self).closeEvent(event)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Jugador humano contra el Agente Inteligente.')
+    parser.add_argument('--seed', type=int, default=None, help='semilla de la secuencia de piezas de ambos tableros')
+    args = parser.parse_args()
+
+    app = QApplication([])
+    versus = Versus(args.seed)
+    sys.exit(app.exec_())
@@ -1,227 +1,370 @@
-from tetris_model import BOARD_DATA, Shape
+from tetris_model import BOARD_DATA, BoardData, Shape, SHAPE_GEOMETRY, calcColumnHeights, calcDropDist
+from tetris_metrics import METRICS
+from tetris_trace import TRACER, traced
+from collections import OrderedDict
+import itertools
 import math
-from datetime import datetime
+import time
 import numpy as np
 
-# Se implementa una estrategia de movimiento para el Agente Inteligente en el Juego de Tetris.
-class TetrisAI(object):
-
-    # Calcula el próximo movimiento óptimo para el tetromino actual del Agente Inteligente en el Juego de Tetris.
-    def nextMove(self):
-        t1 = datetime.now()  # Marca el tiempo de inicio para calcular la duración del cálculo del movimiento.
-        if BOARD_DATA.currentShape == Shape.shapeNone:  # Verifica si no hay una pieza actual en juego.
-            return None  # Si no hay pieza, no hay movimiento a calcular.
+# Potencias precalculadas con la aritmética de Python que usa calculateScore (x ** .7 para los huecos de cada columna y
+# x ** 1.5 para la altura máxima), así calculateScores obtiene exactamente los mismos valores.
+HOLE_POWERS = np.array([x ** .7 for x in range(BoardData.height + 1)])
+HEIGHT_POWERS = np.array([x ** 1.5 for x in range(BoardData.height + 1)])
+
+# Caché LRU de puntuaciones indexada por las máscaras de fila de un tablero. Sirve cuando un mismo tablero se evalúa en
+# lotes distintos: en searchAnytime y ParallelTetrisAI cada subárbol es un lote y raíces distintas llegan a los mismos
+# tableros, y en beamSearch los nodos reutilizados vuelven a generar tableros ya vistos. Los tableros repetidos dentro de
+# un mismo lote se evalúan una sola vez sin pasar por la caché y se cuentan aparte, en duplicates.
+class EvaluationCache(object):
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+
+    def get(self, key):
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return score
 
-        currentDirection = BOARD_DATA.currentDirection  # Almacena la dirección actual de la pieza en juego.
-        currentY = BOARD_DATA.currentY  # Almacena la posición Y actual de la pieza en juego.
-        _, _, minY, _ = BOARD_DATA.nextShape.getBoundingOffsets(0)  # Obtiene el desplazamiento mínimo en Y para la siguiente pieza.
-        nextY = -minY  # Calcula la posición Y inicial para la siguiente pieza.
+    def put(self, key, score):
+        if self.maxSize <= 0:
+            return
+        self.entries[key] = score
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
 
-        strategy = None  # Inicializa la variable de estrategia como None.
-        # Define el rango de rotaciones posibles para la pieza actual basado en su forma.
-        if BOARD_DATA.currentShape.shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
-            d0Range = (0, 1)
-        elif BOARD_DATA.currentShape.shape == Shape.shapeO:
-            d0Range = (0,)
-        else:
-            d0Range = (0, 1, 2, 3)
+    def getStats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'duplicates': self.duplicates,
+                'size': len(self.entries), 'maxSize': self.maxSize}
 
-        # Define el rango de rotaciones posibles para la siguiente pieza basado en su forma.
-        if BOARD_DATA.nextShape.shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
-            d1Range = (0, 1)
-        elif BOARD_DATA.nextShape.shape == Shape.shapeO:
-            d1Range = (0,)
-        else:
-            d1Range = (0, 1, 2, 3)
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
 
-        # Itera sobre las posibles rotaciones de la pieza actual.
-        for d0 in d0Range:
-            minX, maxX, _, _ = BOARD_DATA.currentShape.getBoundingOffsets(d0)  # Obtiene los desplazamientos de límites para la rotación actual.
-            # Itera sobre las posiciones X posibles para la pieza actual.
-            for x0 in range(-minX, BOARD_DATA.width - maxX):
-                board = self.calcStep1Board(d0, x0)  # Calcula el estado del tablero después de colocar la pieza actual.
-                # Itera sobre las posibles rotaciones de la siguiente pieza.
-                for d1 in d1Range:
-                    minX, maxX, _, _ = BOARD_DATA.nextShape.getBoundingOffsets(d1)  # Obtiene los desplazamientos de límites para la siguiente rotación.
-                    dropDist = self.calcNextDropDist(board, d1, range(-minX, BOARD_DATA.width - maxX))  # Calcula la distancia de caída para la siguiente pieza.
-                    # Itera sobre las posiciones X posibles para la siguiente pieza.
-                    for x1 in range(-minX, BOARD_DATA.width - maxX):
-                        score = self.calculateScore(np.copy(board), d1, x1, dropDist)  # Calcula la puntuación para la posición y rotación actual.
-                        # Si no hay estrategia o la puntuación actual es mejor que la estrategia existente, actualiza la estrategia.
-                        if not strategy or strategy[2] < score:
-                            strategy = (d0, x0, score)
-        print("Tiempo Movimiento I.A: ", datetime.now() - t1)  # Imprime la duración del cálculo del movimiento.
-        return strategy  # Devuelve la estrategia calculada.
 
-    def calcNextDropDist(self, data, d0, xRange):
-        res = {}
-        for x0 in xRange:
-            if x0 not in res:
-                res[x0] = BOARD_DATA.height - 1
-            for x, y in BOARD_DATA.nextShape.getCoords(d0, x0, 0):
-                yy = 0
-                while yy + y < BOARD_DATA.height and (yy + y < 0 or data[(y + yy), x] == Shape.shapeNone):
-                    yy += 1
-                yy -= 1
-                if yy < res[x0]:
-                    res[x0] = yy
-        return res
+# Identifica una decisión por el tablero, la pieza actual y las próximas; dos tableros con la misma clave reciben la misma jugada.
+def decisionKey(boardData):
+    return (tuple(boardData.rowMasks), boardData.currentShape.shape, tuple(shape.shape for shape in boardData.preview))
 
-    def calcStep1Board(self, d0, x0):
-        board = np.array(BOARD_DATA.getData()).reshape((BOARD_DATA.height, BOARD_DATA.width))
-        self.dropDown(board, BOARD_DATA.currentShape, d0, x0)
-        return board
 
-    def dropDown(self, data, shape, direction, x0):
-        dy = BOARD_DATA.height - 1
-        for x, y in shape.getCoords(direction, x0, 0):
-            yy = 0
-            while yy + y < BOARD_DATA.height and (yy + y < 0 or data[(y + yy), x] == Shape.shapeNone):
-                yy += 1
-            yy -= 1
-            if yy < dy:
-                dy = yy
-        # print("dropDown: shape {0}, direction {1}, x0 {2}, dy {3}".format(shape.shape, direction, x0, dy))
-        self.dropDownByDist(data, shape, direction, x0, dy)
+# Puntos de cada línea completa en calculateScore; la búsqueda en haz los suma por las líneas ya eliminadas.
+LINE_SCORE = 1.8
 
-    def dropDownByDist(self, data, shape, direction, x0, dist):
-        for x, y in shape.getCoords(direction, x0, 0):
-            data[y + dist, x] = shape.shape
 
-    def calculateScore(self, step1Board, d1, x1, dropDist):
-        # print("calculateScore")
-        t1 = datetime.now()
-        width = BOARD_DATA.width
-        height = BOARD_DATA.height
+# Suelta una pieza sobre las máscaras de fila rows (con sus alturas de columna heights) y devuelve la tupla de máscaras
+# resultante, sin eliminar líneas, o None si la pieza no cabe.
+def placeOnRows(rows, heights, shape, direction, x):
+    geometry = SHAPE_GEOMETRY[shape.shape][direction]
+    minX, _, minY, _ = geometry.bounds
+    dist = calcDropDist(heights, shape, direction, x)
+    if dist + minY < 0:
+        return None
+    placed = list(rows)
+    for dy, mask in geometry.rowMasks:
+        placed[dist + dy] |= mask << (x + minX)
+    return tuple(placed)
 
-        self.dropDownByDist(step1Board, BOARD_DATA.nextShape, d1, x1, dropDist[x1])
-        # print(datetime.now() - t1)
 
-        # Term 1: lines to be removed
-        fullLines, nearFullLines = 0, 0
-        roofY = [0] * width
-        holeCandidates = [0] * width
-        holeConfirm = [0] * width
-        vHoles, vBlocks = 0, 0
-        for y in range(height - 1, -1, -1):
-            hasHole = False
-            hasBlock = False
-            for x in range(width):
-                if step1Board[y, x] == Shape.shapeNone:
-                    hasHole = True
-                    holeCandidates[x] += 1
-                else:
-                    hasBlock = True
-                    roofY[x] = height - y
-                    if holeCandidates[x] > 0:
-                        holeConfirm[x] += holeCandidates[x]
-                        holeCandidates[x] = 0
-                    if holeConfirm[x] > 0:
-                        vBlocks += 1
-            if not hasBlock:
-                break
-            if not hasHole and hasBlock:
-                fullLines += 1
-        vHoles = sum([x ** .7 for x in holeConfirm])
-        maxHeight = max(roofY) - fullLines
-        # print(datetime.now() - t1)
+# Elimina las filas completas de rows y devuelve las máscaras resultantes y la cantidad de líneas eliminadas.
+def clearRows(rows):
+    kept = [mask for mask in rows if mask != BoardData.fullRowMask]
+    lines = len(rows) - len(kept)
+    return (0,) * lines + tuple(kept), lines
 
-        roofDy = [roofY[i] - roofY[i+1] for i in range(len(roofY) - 1)]
 
-        if len(roofY) <= 0:
-            stdY = 0
-        else:
-            stdY = math.sqrt(sum([y ** 2 for y in roofY]) / len(roofY) - (sum(roofY) / len(roofY)) ** 2)
-        if len(roofDy) <= 0:
-            stdDY = 0
-        else:
-            stdDY = math.sqrt(sum([y ** 2 for y in roofDy]) / len(roofDy) - (sum(roofDy) / len(roofDy)) ** 2)
+# Se implementa una estrategia de movimiento para el Agente Inteligente en el Juego de Tetris.
+class TetrisAI(object):
 
-        absDy = sum([abs(x) for x in roofDy])
-        maxDy = max(roofY) - min(roofY)
-        # print(datetime.now() - t1)
+    # Cada instancia decide sobre un tablero concreto; por defecto usa el tablero global BOARD_DATA.
+    # cacheSize es la cantidad máxima de tableros evaluados que se recuerdan (ver EvaluationCache). La búsqueda completa
+    # de dos piezas no la usa: evalúa todo en un solo lote y sus tableros, con una pieza más, no se repiten en la jugada siguiente.
+    # Con beamWidth se usa beamSearch sobre depth piezas (la actual y las de la cola de próximas piezas); sin beamWidth
+    # se evalúan todas las combinaciones de la pieza actual y la siguiente.
+    def __init__(self, boardData=None, cacheSize=50000, depth=2, beamWidth=None):
+        self.boardData = BOARD_DATA if boardData is None else boardData
+        self.cache = EvaluationCache(cacheSize)
+        self.depth = depth
+        self.beamWidth = beamWidth
+        self.reusedBeam = None  # Parte del árbol de la decisión anterior que se puede reutilizar (ver beamSearch).
+        self.speculating = False  # Verdadero mientras speculate busca jugadas para piezas que aún no se conocen.
 
-        score = fullLines * 1.8 - vHoles * 1.0 - vBlocks * 0.5 - maxHeight ** 1.5 * 0.02 \
-            - stdY * 0.0 - stdDY * 0.01 - absDy * 0.2 - maxDy * 0.3
-        # print(score, fullLines, vHoles, vBlocks, maxHeight, stdY, stdDY, absDy, roofY, d0, x0, d1, x1)
-        return score
+    # Calcula el próximo movimiento óptimo para el tetromino actual del Agente Inteligente en el Juego de Tetris.
+    # Sin timeBudget se evalúan todas las combinaciones; con timeBudget (en segundos) se usa searchAnytime y la
+    # decisión termina a tiempo aunque no alcance a revisar todo.
+    # Si se pasa boardData, la instancia pasa a decidir sobre ese tablero; así una misma I.A. atiende varios tableros.
+    @traced('TetrisAI.nextMove')
+    def nextMove(self, timeBudget=None, boardData=None):
+        if boardData is not None:
+            self.boardData = boardData
+        t1 = time.perf_counter()  # Marca el tiempo de inicio para medir la duración del cálculo del movimiento.
+        if self.boardData.currentShape.shape == Shape.shapeNone:  # Verifica si no hay una pieza actual en juego.
+            return None  # Si no hay pieza, no hay movimiento a calcular.
+        strategy = self.searchMove(timeBudget)
+        METRICS.observe('ai.decisionMs', (time.perf_counter() - t1) * 1000.0)  # Registra la duración del cálculo del movimiento.
+        return strategy  # Devuelve la estrategia calculada.
 
+    # La búsqueda de nextMove, sin registrar la decisión en METRICS ni en el visor de trazas; speculate la usa para que
+    # ai.decisionMs mida solo decisiones reales.
+    def searchMove(self, timeBudget=None):
+        t1 = time.perf_counter()
+        if self.boardData.currentShape.shape == Shape.shapeNone:
+            return None
 
-TETRIS_AI = TetrisAI()
+        strategy = None  # Inicializa la variable de estrategia como None.
+        if self.beamWidth is not None:
+            return self.beamSearch(self.depth, self.beamWidth, None if timeBudget is None else t1 + timeBudget)
+        if timeBudget is not None:
+            return self.searchAnytime(t1 + timeBudget)
 
+        d0Range = self.boardData.currentShape.getRotations()  # Rotaciones distintas de la pieza actual según su forma.
 
-class TetrisAI1(object):
+        # Reúne todas las combinaciones (d0, x0, d1, x1), cada una descrita por las máscaras de fila del tablero
+        # resultante, que sirven como clave de la caché de evaluaciones.
+        moves = []  # (d0, x0) de cada candidato.
+        keys = []  # Máscaras de fila del tablero con las dos piezas de cada candidato.
+        # Itera sobre las posibles rotaciones de la pieza actual.
+        for d0 in d0Range:
+            with TRACER.span('TetrisAI.nextMove.d0', d0=d0):  # Un tramo por cada subárbol de la rotación d0.
+                minX, maxX, _, _ = self.boardData.currentShape.getBoundingOffsets(d0)  # Obtiene los desplazamientos de límites para la rotación actual.
+                # Itera sobre las posiciones X posibles para la pieza actual.
+                for x0 in range(-minX, self.boardData.width - maxX):
+                    rootKeys = self.expandRoot(d0, x0)
+                    keys.extend(rootKeys)
+                    moves.extend([(d0, x0)] * len(rootKeys))
+
+        self.countCandidates(len(keys))
+        if moves:
+            scores = self.evaluateKeys(keys, useCache=False)  # Un solo lote: los repetidos se evalúan una vez.
+            # np.argmax devuelve el primer máximo, igual que la comparación estricta del recorrido secuencial.
+            best = int(np.argmax(scores))
+            strategy = (moves[best][0], moves[best][1], float(scores[best]))
+        return strategy
 
-    def nextMove(self):
-        t1 = datetime.now()
-        if BOARD_DATA.currentShape == Shape.shapeNone:
+    # Cuenta los tableros generados en ai.candidates, o en ai.speculativeCandidates si la búsqueda es de speculate.
+    def countCandidates(self, count):
+        METRICS.inc('ai.speculativeCandidates' if self.speculating else 'ai.candidates', count)
+
+    # Devuelve las claves de todas las posiciones (d1, x1) de la siguiente pieza después de soltar la pieza actual en
+    # (d0, x0), o una lista vacía si no cabe. En lugar de copiar el tablero, la pieza actual se coloca sobre el propio
+    # tablero con placePiece y se quita con undoPiece.
+    def expandRoot(self, d0, x0):
+        boardData = self.boardData
+        nextShape = boardData.nextShape
+        keys = []
+        # Suelta la pieza actual sin eliminar líneas: la puntuación cuenta las líneas que completan ambas piezas.
+        record = boardData.placePiece(boardData.currentShape, d0, x0, clearLines=False)
+        if record is None:  # La pieza no cabe en esa columna.
+            return keys
+        step1Rows = boardData.rowMasks
+        # Itera sobre las posibles rotaciones de la siguiente pieza.
+        for d1 in nextShape.getRotations():
+            minX, maxX, _, _ = nextShape.getBoundingOffsets(d1)  # Obtiene los desplazamientos de límites para la siguiente rotación.
+            dropDist = self.calcNextDropDist(boardData.columnHeights, d1, range(-minX, boardData.width - maxX))  # Calcula la distancia de caída para la siguiente pieza.
+            rowMasks = SHAPE_GEOMETRY[nextShape.shape][d1].rowMasks
+            # Itera sobre las posiciones X posibles para la siguiente pieza.
+            for x1 in range(-minX, boardData.width - maxX):
+                rows = step1Rows[:]
+                for dy, mask in rowMasks:
+                    rows[dropDist[x1] + dy] |= mask << (x1 + minX)
+                keys.append(tuple(rows))
+        boardData.undoPiece(record)
+        return keys
+
+    # Expande cada (d0, x0) de roots y devuelve, en el mismo orden, la mejor puntuación de su subárbol (None si la pieza
+    # no cabe). Todas las claves se evalúan en un solo lote. Cada tramo de raíces seguidas con la misma rotación se
+    # registra como un TetrisAI.nextMove.d0, igual que en la búsqueda completa.
+    def scoreRoots(self, roots):
+        rootKeys = []
+        for d0, group in itertools.groupby(roots, key=lambda root: root[0]):
+            group = list(group)
+            with TRACER.span('TetrisAI.nextMove.d0', d0=d0, roots=len(group)):
+                rootKeys.extend(self.expandRoot(d0, x0) for _, x0 in group)
+        keys = [key for childKeys in rootKeys for key in childKeys]
+        self.countCandidates(len(keys))
+        if not keys:
+            return [None] * len(roots)
+        scores = self.evaluateKeys(keys)
+        results = []
+        offset = 0
+        for childKeys in rootKeys:
+            if childKeys:
+                results.append(float(scores[offset:offset + len(childKeys)].max()))
+                offset += len(childKeys)
+            else:
+                results.append(None)
+        return results
+
+    # Búsqueda con límite de tiempo. Primero puntúa cada (d0, x0) solo con la pieza actual, que es barato, y después
+    # expande los subárboles de a chunkSize en orden de esa puntuación hasta llegar a deadline (segundos de
+    # time.perf_counter). Si no alcanza a expandir ninguno, juega el mejor (d0, x0) según la puntuación previa.
+    # Con tiempo suficiente devuelve la misma jugada que la búsqueda completa.
+    def searchAnytime(self, deadline, chunkSize=4):
+        boardData = self.boardData
+        roots, rootKeys = [], []
+        for d0 in boardData.currentShape.getRotations():
+            minX, maxX, _, _ = boardData.currentShape.getBoundingOffsets(d0)
+            for x0 in range(-minX, boardData.width - maxX):
+                record = boardData.placePiece(boardData.currentShape, d0, x0, clearLines=False)
+                if record is None:
+                    continue
+                rootKeys.append(tuple(boardData.rowMasks))
+                boardData.undoPiece(record)
+                roots.append((d0, x0))
+        if not roots:
             return None
 
-        currentDirection = BOARD_DATA.currentDirection
-        currentY = BOARD_DATA.currentY
-        _, _, minY, _ = BOARD_DATA.nextShape.getBoundingOffsets(0)
-        nextY = -minY
+        preScores = self.evaluateKeys(rootKeys)
+        order = sorted(range(len(roots)), key=lambda i: -preScores[i])  # sorted es estable: los empates quedan en orden.
+        strategy = (roots[order[0]][0], roots[order[0]][1], float(preScores[order[0]]))
 
-        # print("=======")
-        strategy = None
-        if BOARD_DATA.currentShape.shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
-            d0Range = (0, 1)
-        elif BOARD_DATA.currentShape.shape == Shape.shapeO:
-            d0Range = (0,)
-        else:
-            d0Range = (0, 1, 2, 3)
+        bestScore, bestRoot = None, None
+        for start in range(0, len(order), chunkSize):
+            if time.perf_counter() >= deadline:
+                METRICS.inc('ai.budgetExpired')
+                break
+            chunk = order[start:start + chunkSize]
+            for i, score in zip(chunk, self.scoreRoots([roots[i] for i in chunk])):
+                # En caso de empate gana el (d0, x0) que la búsqueda completa habría visto primero.
+                if score is not None and (bestScore is None or score > bestScore or (score == bestScore and i < bestRoot)):
+                    bestScore, bestRoot = score, i
+        if bestRoot is not None:
+            strategy = (roots[bestRoot][0], roots[bestRoot][1], bestScore)
+        return strategy
 
-        if BOARD_DATA.nextShape.shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
-            d1Range = (0, 1)
-        elif BOARD_DATA.nextShape.shape == Shape.shapeO:
-            d1Range = (0,)
-        else:
-            d1Range = (0, 1, 2, 3)
+    # Búsqueda en haz sobre la pieza actual y las depth - 1 primeras de la cola de próximas piezas. En cada nivel coloca
+    # la pieza en todas las posiciones de cada tablero del haz, puntúa los tableros con evaluateKeys (más LINE_SCORE por
+    # cada línea eliminada en niveles anteriores) y se queda con los beamWidth mejores tableros distintos, ya sin sus
+    # líneas completas. Devuelve la primera jugada del mejor tablero del último nivel; si se llega a deadline, la del
+    # mejor tablero del último nivel terminado.
+    # Al terminar guarda en reusedBeam el haz del último nivel que desciende de la jugada elegida. Si en la llamada
+    # siguiente el tablero es el que dejó esa jugada y la cola de piezas sigue igual, la búsqueda parte de ese haz y
+    # solo agrega el nivel de la pieza recién revelada.
+    @traced('TetrisAI.beamSearch')
+    def beamSearch(self, depth, beamWidth, deadline=None):
+        boardData = self.boardData
+        shapes = [boardData.currentShape] + boardData.preview[:depth - 1]
+        beam = [(tuple(boardData.rowMasks), (), 0)]  # (máscaras de fila, jugadas desde la raíz, líneas eliminadas)
+        level = 0
+        if self.reusedBeam is not None:
+            rows, reusedShapes, reusedNodes = self.reusedBeam
+            if rows == beam[0][0] and len(reusedShapes) < len(shapes) and \
+                    reusedShapes == tuple(shape.shape for shape in shapes[:len(reusedShapes)]):
+                beam = reusedNodes
+                level = len(reusedShapes)
+                METRICS.inc('ai.reusedNodes', len(reusedNodes))
+        self.reusedBeam = None
 
-        for d0 in d0Range:
-            minX, maxX, _, _ = BOARD_DATA.currentShape.getBoundingOffsets(d0)
-            for x0 in range(-minX, BOARD_DATA.width - maxX):
-                board = self.calcStep1Board(d0, x0)
-                for d1 in d1Range:
-                    minX, maxX, _, _ = BOARD_DATA.nextShape.getBoundingOffsets(d1)
-                    dropDist = self.calcNextDropDist(board, d1, range(-minX, BOARD_DATA.width - maxX))
-                    for x1 in range(-minX, BOARD_DATA.width - maxX):
-                        score = self.calculateScore(np.copy(board), d1, x1, dropDist)
-                        if not strategy or strategy[2] < score:
-                            strategy = (d0, x0, score)
-        print("===", datetime.now() - t1)
+        strategy = None
+        for shape in shapes[level:]:
+            with TRACER.span('TetrisAI.beamSearch.level', level=level, nodes=len(beam)):  # Un tramo por cada nivel del haz.
+                keys, children = [], []
+                for rows, moves, lines in beam:
+                    heights = calcColumnHeights(rows)
+                    for d in shape.getRotations():
+                        minX, maxX, _, _ = shape.getBoundingOffsets(d)
+                        for x in range(-minX, boardData.width - maxX):
+                            placed = placeOnRows(rows, heights, shape, d, x)
+                            if placed is not None:
+                                keys.append(placed)
+                                children.append((moves + ((d, x),), lines))
+                if not keys:
+                    break
+                self.countCandidates(len(keys))
+                scores = self.evaluateKeys(keys) + LINE_SCORE * np.array([lines for _, lines in children])
+                order = np.argsort(-scores, kind='stable')  # Estable: en caso de empate gana el primero generado.
+                best = int(order[0])
+                strategy = (children[best][0][0][0], children[best][0][0][1], float(scores[best]))
+                level += 1
+                # En el último nivel solo interesan los descendientes de la jugada elegida, que se guardan para la próxima decisión.
+                # El plazo se revisa después, para que al llegar al último nivel el haz ya esté filtrado y tenga sus jugadas.
+                beam = self.selectBeam(keys, children, order, beamWidth, strategy[:2] if level == len(shapes) else None)
+                if deadline is not None and time.perf_counter() >= deadline:
+                    METRICS.inc('ai.budgetExpired')
+                    break
+
+        if strategy is not None and level == len(shapes) and level > 1:
+            self.saveReusedBeam(shapes, beam, strategy[:2])
         return strategy
 
-    def calcNextDropDist(self, data, d0, xRange):
-        res = {}
-        for x0 in xRange:
-            if x0 not in res:
-                res[x0] = BOARD_DATA.height - 1
-            for x, y in BOARD_DATA.nextShape.getCoords(d0, x0, 0):
-                yy = 0
-                while yy + y < BOARD_DATA.height and (yy + y < 0 or data[(y + yy), x] == Shape.shapeNone):
-                    yy += 1
-                yy -= 1
-                if yy < res[x0]:
-                    res[x0] = yy
-        return res
-
+    # Elige los beamWidth mejores tableros distintos (según order) y les elimina las líneas completas.
+    def selectBeam(self, keys, children, order, beamWidth, firstMove=None):
+        beam, seen = [], set()
+        for i in order:
+            if len(beam) >= beamWidth:
+                break
+            moves, lines = children[i]
+            if keys[i] in seen or (firstMove is not None and moves[0] != firstMove):
+                continue
+            seen.add(keys[i])  # Caminos distintos que llegan al mismo tablero ocupan un solo lugar del haz.
+            rows, cleared = clearRows(keys[i])
+            beam.append((rows, moves, lines + cleared))
+        return beam
+
+    # Guarda los nodos del haz final (todos descendientes de la jugada elegida) sin esa primera jugada y sin las líneas
+    # que elimina, junto con el tablero que esa jugada deja y las formas de las piezas que ya cubren.
+    def saveReusedBeam(self, shapes, beam, firstMove):
+        heights = calcColumnHeights(self.boardData.rowMasks)
+        placed = placeOnRows(tuple(self.boardData.rowMasks), heights, shapes[0], firstMove[0], firstMove[1])
+        rows, cleared = clearRows(placed)
+        nodes = [(nodeRows, moves[1:], lines - cleared) for nodeRows, moves, lines in beam]
+        if nodes:
+            self.reusedBeam = (rows, tuple(shape.shape for shape in shapes[1:]), nodes)
+
+    # Precalcula la decisión siguiente suponiendo que la pieza actual cae según move. Como la pieza que aparecerá después
+    # todavía no se conoce, se busca una jugada para cada forma posible. Devuelve {decisionKey(tablero): jugada}.
+    # Estas búsquedas se miden aparte (ai.speculativeMs y ai.speculativeCandidates), no como decisiones.
+    @traced('TetrisAI.speculate')
+    def speculate(self, move, timeBudget=None):
+        boardData = self.boardData.snapshot()
+        if boardData.placePiece(boardData.currentShape, move[0], move[1]) is None:
+            return {}
+        boardData.currentShape = boardData.nextShape
+        known = boardData.preview[1:]
+
+        results = {}
+        original = self.boardData
+        reusedBeam = self.reusedBeam  # Cada suposición parte del árbol de la decisión real, que se conserva al final.
+        self.boardData = boardData
+        self.speculating = True
+        try:
+            for shape in range(1, len(Shape.shapeCoord)):
+                boardData.preview = known + [Shape(shape)]
+                self.reusedBeam = reusedBeam
+                with METRICS.time('ai.speculativeMs'):
+                    results[decisionKey(boardData)] = self.searchMove(timeBudget)
+        finally:
+            self.boardData = original
+            self.reusedBeam = reusedBeam
+            self.speculating = False
+        return results
+
+    # Distancia de caída de la siguiente pieza para cada x0, calculada con las alturas de columna del tablero del paso 1.
+    def calcNextDropDist(self, columnHeights, d0, xRange):
+        return {x0: calcDropDist(columnHeights, self.boardData.nextShape, d0, x0) for x0 in xRange}
+
+    # Devuelve el tablero después de soltar la pieza actual en (d0, x0) y las alturas de columna resultantes.
     def calcStep1Board(self, d0, x0):
-        board = np.array(BOARD_DATA.getData()).reshape((BOARD_DATA.height, BOARD_DATA.width))
-        self.dropDown(board, BOARD_DATA.currentShape, d0, x0)
-        return board
-
-    def dropDown(self, data, shape, direction, x0):
-        dy = BOARD_DATA.height - 1
-        for x, y in shape.getCoords(direction, x0, 0):
-            yy = 0
-            while yy + y < BOARD_DATA.height and (yy + y < 0 or data[(y + yy), x] == Shape.shapeNone):
-                yy += 1
-            yy -= 1
-            if yy < dy:
-                dy = yy
+        board = np.array(self.boardData.getData()).reshape((self.boardData.height, self.boardData.width))
+        columnHeights = self.boardData.getColumnHeights()
+        self.dropDown(board, self.boardData.currentShape, d0, x0, columnHeights)
+        return board, columnHeights
+
+    # Suelta la pieza sobre data usando las alturas de columna y actualiza columnHeights con los bloques colocados.
+    def dropDown(self, data, shape, direction, x0, columnHeights):
+        dy = calcDropDist(columnHeights, shape, direction, x0)
         # print("dropDown: shape {0}, direction {1}, x0 {2}, dy {3}".format(shape.shape, direction, x0, dy))
         self.dropDownByDist(data, shape, direction, x0, dy)
+        for x, y in shape.getCoords(direction, x0, dy):
+            columnHeights[x] = max(columnHeights[x], self.boardData.height - y)
 
     def dropDownByDist(self, data, shape, direction, x0, dist):
         for x, y in shape.getCoords(direction, x0, 0):
@@ -229,11 +372,10 @@ class TetrisAI1(object):
 
     def calculateScore(self, step1Board, d1, x1, dropDist):
         # print("calculateScore")
-        t1 = datetime.now()
-        width = BOARD_DATA.width
-        height = BOARD_DATA.height
+        width = self.boardData.width
+        height = self.boardData.height
 
-        self.dropDownByDist(step1Board, BOARD_DATA.nextShape, d1, x1, dropDist[x1])
+        self.dropDownByDist(step1Board, self.boardData.nextShape, d1, x1, dropDist[x1])
         # print(datetime.now() - t1)
 
         # Term 1: lines to be removed
@@ -286,5 +428,83 @@ class TetrisAI1(object):
         return score
 
 
-TETRIS_AI1 = TetrisAI1()
+    # Puntúa tableros dados como tuplas de máscaras de fila. Las claves repetidas en keys se evalúan una sola vez y, con
+    # useCache, las que ya están en la caché no se vuelven a evaluar; las demás se convierten en un lote de forma
+    # (N, alto, ancho) para calculateScores.
+    @traced('TetrisAI.evaluateKeys')
+    def evaluateKeys(self, keys, useCache=True):
+        scores = np.empty(len(keys))
+        pending = {}
+        hits = 0
+        duplicates = 0
+        for i, key in enumerate(keys):
+            if key in pending:
+                pending[key].append(i)
+                duplicates += 1
+                continue
+            score = self.cache.get(key) if useCache else None
+            if score is None:
+                pending[key] = [i]
+            else:
+                scores[i] = score
+                hits += 1
+        self.cache.duplicates += duplicates
+        METRICS.inc('ai.cacheHits', hits)
+        METRICS.inc('ai.duplicateKeys', duplicates)
+        METRICS.inc('ai.evaluations', len(pending))
+        if pending:
+            rows = np.array(list(pending), dtype=np.int32)
+            boards = (rows[:, :, np.newaxis] >> np.arange(self.boardData.width)) & 1
+            for (key, indices), score in zip(pending.items(), self.calculateScores(boards)):
+                if useCache:
+                    self.cache.put(key, score)
+                scores[indices] = score
+        return scores
+
+    # Versión vectorizada de calculateScore para un lote de tableros de forma (N, alto, ancho) que ya incluyen las dos piezas.
+    # Calcula los mismos términos con operaciones sobre arreglos y devuelve exactamente las mismas puntuaciones, una por tablero.
+    def calculateScores(self, boards):
+        n, height, width = boards.shape
+        filled = boards != Shape.shapeNone
+
+        # El recorrido original sube desde el fondo y se detiene en la primera fila sin bloques; las filas por encima no cuentan.
+        rowHasBlock = filled.any(axis=2)
+        activeRows = np.cumprod(rowHasBlock[:, ::-1], axis=1)[:, ::-1].astype(bool)
+        filled &= activeRows[:, :, np.newaxis]
+
+        # Term 1: lines to be removed
+        fullLines = filled.all(axis=2).sum(axis=1)
+
+        # Altura de cada columna (roofY) a partir del bloque más alto.
+        hasBlock = filled.any(axis=1)
+        topY = filled.argmax(axis=1)
+        roofY = np.where(hasBlock, height - topY, 0)
+
+        # Huecos por columna (holeConfirm) y bloques que tienen algún hueco debajo (vBlocks).
+        emptyRows = ~filled & activeRows[:, :, np.newaxis]
+        emptyBelow = np.cumsum(emptyRows[:, ::-1, :], axis=1)[:, ::-1, :]
+        holeConfirm = np.where(hasBlock, np.take_along_axis(emptyBelow, topY[:, np.newaxis, :], axis=1)[:, 0, :], 0)
+        vBlocks = (filled & (emptyBelow > 0)).sum(axis=(1, 2))
+        # Las columnas se suman en el mismo orden que sum() para no alterar el redondeo.
+        vHoles = HOLE_POWERS[holeConfirm[:, 0]]
+        for x in range(1, width):
+            vHoles = vHoles + HOLE_POWERS[holeConfirm[:, x]]
+        maxHeight = roofY.max(axis=1) - fullLines
+
+        roofDy = roofY[:, :-1] - roofY[:, 1:]
+        # stdY tiene peso 0.0 en la fórmula, por eso no se calcula.
+        stdDY = np.sqrt((roofDy ** 2).sum(axis=1) / (width - 1) - (roofDy.sum(axis=1) / (width - 1)) ** 2)
+        absDy = np.abs(roofDy).sum(axis=1)
+        maxDy = roofY.max(axis=1) - roofY.min(axis=1)
+
+        score = fullLines * 1.8 - vHoles * 1.0 - vBlocks * 0.5 - HEIGHT_POWERS[maxHeight] * 0.02 \
+            - stdDY * 0.01 - absDy * 0.2 - maxDy * 0.3
+        return score
+
+
+TETRIS_AI = TetrisAI()
+
 
+# Nombres anteriores de la copia de TetrisAI, que ahora es la misma clase.
+TetrisAI1 = TetrisAI
+TETRIS_AI1 = TetrisAI()
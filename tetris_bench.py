@@ -0,0 +1,221 @@
+# Banco de pruebas de rendimiento de los caminos críticos del modelo, de la I.A. y del pintado del tablero.
+# Cada prueba usa tableros generados con una semilla fija, mide la latencia de cada operación y reporta operaciones por
+# segundo y percentiles. Los resultados se pueden guardar como línea base en JSON y comparar con ejecuciones posteriores:
+#   python tetris_bench.py --save base.json
+#   python tetris_bench.py --compare base.json
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from tetris_model import BoardData, Shape, calcColumnHeights
+from tetris_ai import TetrisAI
+from tetris_metrics import percentile
+
+SHAPE_NAMES = ' ILJTOSZ'  # Letra de cada forma, en el orden de Shape.shapeI a Shape.shapeZ.
+
+# Genera un tablero reproducible: suelta piezas al azar (según la semilla) hasta llegar a la altura indicada.
+def makeBoard(seed, maxHeight=10):
+    rng = random.Random(seed)
+    boardData = BoardData(rng)
+    boardData.createNewPiece()
+    while max(boardData.getColumnHeights()) < maxHeight:
+        direction = rng.choice(boardData.currentShape.getRotations())
+        minX, maxX, _, _ = boardData.currentShape.getBoundingOffsets(direction)
+        boardData.dropDownAt(direction, rng.randint(-minX, BoardData.width - 1 - maxX))
+    return boardData
+
+
+# Igual que makeBoard, pero completa algunas filas del fondo para que removeFullLines tenga líneas que eliminar.
+def makeBoardWithLines(seed, lines=2):
+    boardData = makeBoard(seed)
+    rng = random.Random(seed)
+    for y in rng.sample(range(BoardData.height - 8, BoardData.height), lines):
+        for x in range(BoardData.width):
+            if not boardData.getValue(x, y):
+                boardData.backBoard[x + y * BoardData.width] = rng.randint(1, 7)
+                boardData.rowMasks[y] |= 1 << x
+                boardData.rowFill[y] += 1
+                boardData.columnBlocks[x] += 1
+    boardData.columnHeights = calcColumnHeights(boardData.rowMasks)
+    return boardData
+
+
+# Ejecuta run(state) repetidamente, con un estado nuevo de setup() en cada llamada (fuera de la medición), hasta
+# completar minCount llamadas y minTime segundos. Devuelve operaciones por segundo y percentiles de latencia en µs.
+def measure(setup, run, minCount=20, minTime=0.5):
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < minCount or time.perf_counter() - started < minTime:
+        state = setup()
+        t1 = time.perf_counter()
+        run(state)
+        latencies.append(time.perf_counter() - t1)
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'opsPerSecond': len(latencies) / total if total > 0 else 0.0,
+        'p50': percentile(latencies, 50) * 1e6,
+        'p90': percentile(latencies, 90) * 1e6,
+        'p99': percentile(latencies, 99) * 1e6,
+    }
+
+
+# Define las pruebas como {nombre: (setup, run)}. Todas usan tableros generados a partir de seed, y cada una elige sus
+# entradas con su propio random.Random(seed), para que ver los mismos datos no dependa de qué otras pruebas se ejecutan.
+def buildBenchmarks(seed):
+    benchmarks = {}
+    boards = [makeBoard(seed + i) for i in range(8)]
+
+    rng = random.Random(seed)
+    moves = [(boards[i % len(boards)], Shape(rng.randint(1, 7)), rng.randint(0, 3),
+              rng.randint(-2, BoardData.width + 1), rng.randint(-2, BoardData.height + 1)) for i in range(1000)]
+    moveIndex = [0]
+
+    def nextTryMove():
+        moveIndex[0] = (moveIndex[0] + 1) % len(moves)
+        return moves[moveIndex[0]]
+    benchmarks['BoardData.tryMove'] = (nextTryMove, lambda m: m[0].tryMove(m[1], m[2], m[3], m[4]))
+
+    linesBoards = [makeBoardWithLines(seed + i) for i in range(8)]
+    linesRng = random.Random(seed)
+    benchmarks['BoardData.removeFullLines'] = (
+        lambda: linesBoards[linesRng.randrange(len(linesBoards))].snapshot(), lambda b: b.removeFullLines())
+
+    dropRng = random.Random(seed)
+
+    def dropDownSetup():
+        boardData = boards[dropRng.randrange(len(boards))].snapshot()
+        boardData.rng = random.Random(dropRng.random())
+        return boardData
+    benchmarks['BoardData.dropDown'] = (dropDownSetup, lambda b: b.dropDown())
+
+    # Una prueba de nextMove por cada par (pieza actual, siguiente pieza), sin caché para medir la búsqueda completa.
+    ai = TetrisAI(cacheSize=0)
+    for current in range(1, 8):
+        for following in range(1, 8):
+            def nextMoveSetup(current=current, following=following, rng=random.Random(seed)):
+                boardData = boards[rng.randrange(len(boards))].snapshot()
+                boardData.currentShape = Shape(current)
+                boardData.nextShape = Shape(following)
+                ai.boardData = boardData
+                return ai
+            name = 'TetrisAI.nextMove[{0}{1}]'.format(SHAPE_NAMES[current], SHAPE_NAMES[following])
+            benchmarks[name] = (nextMoveSetup, lambda a: a.nextMove())
+
+    scoreRng = random.Random(seed)
+
+    def scoreSetup():
+        boardData = boards[scoreRng.randrange(len(boards))]
+        ai.boardData = boardData
+        step1Board, columnHeights = ai.calcStep1Board(0, 4)
+        return step1Board, ai.calcNextDropDist(columnHeights, 0, range(1, BoardData.width - 1))
+    benchmarks['TetrisAI.calculateScore'] = (scoreSetup, lambda s: ai.calculateScore(np.copy(s[0]), 0, 4, s[1]))
+
+    batch = np.array([np.array(b.getData(), dtype=np.int8).reshape((BoardData.height, BoardData.width))
+                      for b in boards] * 128)
+    benchmarks['TetrisAI.calculateScores[1024]'] = (lambda: batch, lambda b: ai.calculateScores(b))
+
+    benchmarks.update(buildPaintBenchmarks(boards))
+    return benchmarks
+
+
+# Pruebas de pintado del tablero de la I.A. en una plataforma Qt sin pantalla: el tablero completo y, en
+# Board.paintEvent[dirty], solo las zonas que cambian cuando la pieza baja una fila, y en Board.paintEvent[image] el
+# tablero completo pintado como una sola imagen (BoardImage). Se omiten si PyQt5 no está instalado.
+def buildPaintBenchmarks(boards):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtGui import QPixmap, QRegion
+        from PyQt5.QtCore import QRect
+    except ImportError:
+        return {}
+    import ai
+
+    buildPaintBenchmarks.app = QApplication.instance() or QApplication([])
+    board = ai.Board(None, 25, BoardData())
+    imageBoard = ai.Board(None, 25, BoardData(), renderer='image')
+    pixmap = QPixmap(board.size())
+    boardIndex = {'paint': 0, 'image': 0, 'dirty': 0}  # Cada prueba recorre los tableros por su cuenta.
+
+    def nextBoard(name):
+        boardIndex[name] = (boardIndex[name] + 1) % len(boards)
+        return boards[boardIndex[name]]
+
+    def paintSetup():
+        board.boardData = nextBoard('paint')
+        return board
+
+    def imageSetup():
+        imageBoard.boardData = nextBoard('image')
+        return imageBoard
+
+    def dirtySetup():
+        boardData = nextBoard('dirty').snapshot()
+        board.boardData = boardData
+        boardData.takeDirtyRegion()
+        boardData.moveDown()
+        region = QRegion()
+        for x, y, w, h in boardData.takeDirtyRegion():
+            region = region.united(QRect(x * board.gridSize, y * board.gridSize, w * board.gridSize, h * board.gridSize))
+        return region
+
+    return {
+        'Board.paintEvent': (paintSetup, lambda b: b.render(pixmap)),
+        'Board.paintEvent[dirty]': (dirtySetup, lambda region: board.render(pixmap, region.boundingRect().topLeft(), region)),
+        'Board.paintEvent[image]': (imageSetup, lambda b: b.render(pixmap)),
+    }
+
+
+# Compara los resultados con una línea base y devuelve los nombres de las pruebas cuyas operaciones por segundo
+# bajaron más que threshold (por ejemplo 0.2 = 20 %).
+def findRegressions(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and result['opsPerSecond'] < base['opsPerSecond'] * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Banco de pruebas de rendimiento del Tetris.')
+    parser.add_argument('--seed', type=int, default=1, help='semilla de los tableros de prueba')
+    parser.add_argument('--time', type=float, default=0.5, help='segundos mínimos por prueba')
+    parser.add_argument('--only', default=None, help='ejecuta solo las pruebas cuyo nombre contenga este texto')
+    parser.add_argument('--save', default=None, help='guarda los resultados como línea base en este archivo JSON')
+    parser.add_argument('--compare', default=None, help='compara con la línea base guardada en este archivo JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='caída de operaciones por segundo que se considera regresión')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    print("{0:34} {1:>12} {2:>10} {3:>10} {4:>10}".format('Prueba', 'ops/s', 'p50 µs', 'p90 µs', 'p99 µs'))
+    for name, (setup, run) in buildBenchmarks(args.seed).items():
+        if args.only and args.only not in name:
+            continue
+        result = measure(setup, run, minTime=args.time)
+        results[name] = result
+        change = ''
+        if name in baseline:
+            change = "{0:+.1f} %".format((result['opsPerSecond'] / baseline[name]['opsPerSecond'] - 1) * 100)
+        print("{0:34} {1:12.1f} {2:10.1f} {3:10.1f} {4:10.1f} {5}".format(
+            name, result['opsPerSecond'], result['p50'], result['p90'], result['p99'], change))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'seed': args.seed, 'results': results}, f, indent=2)
+
+    regressions = findRegressions(results, baseline, args.threshold)
+    for name in regressions:
+        print("Regresión: " + name)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,164 @@
+# Registro de métricas del juego dentro del proceso: contadores y histogramas que reemplazan los print de tiempos.
+# Está desactivado por defecto y entonces cada llamada vuelve de inmediato. Se activa con la variable de entorno
+# TETRIS_METRICS=archivo.json (se admite {pid} en el nombre) y al salir del programa se guarda todo en ese archivo.
+# Los procesos de un multiprocessing.Pool terminan sin ejecutar atexit: deben devolver lo que registran con drain() junto
+# con cada resultado, y el proceso principal lo suma a su registro con merge().
+import atexit
+import collections
+import json
+import os
+import time
+
+
+# Percentil p (0 a 100) con interpolación lineal entre los dos valores más cercanos.
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100.0
+    i = int(k)
+    if i + 1 >= len(values):
+        return float(values[-1])
+    return values[i] + (values[i + 1] - values[i]) * (k - i)
+
+
+# Histograma de valores: guarda cantidad, suma, mínimo y máximo de todas las muestras y las últimas maxSamples
+# muestras para calcular percentiles.
+class Histogram(object):
+    def __init__(self, maxSamples=10000):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = collections.deque(maxlen=maxSamples)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    # Suma las muestras de otro histograma, dado como el estado que devuelve getState().
+    def merge(self, state):
+        count, total, low, high, samples = state
+        if not count:
+            return
+        self.count += count
+        self.total += total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.samples.extend(samples)
+
+    def getState(self):
+        return (self.count, self.total, self.min, self.max, list(self.samples))
+
+    def toDict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min,
+            'max': self.max,
+            'p50': percentile(self.samples, 50),
+            'p90': percentile(self.samples, 90),
+            'p99': percentile(self.samples, 99),
+        }
+
+
+# Mide el tiempo de un bloque with y lo agrega al histograma, en milisegundos.
+class Timer(object):
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.t1 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.t1) * 1000.0)
+        return False
+
+
+# Bloque with que no hace nada, para cuando el registro está desactivado.
+class NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class MetricsRegistry(object):
+    def __init__(self):
+        self.enabled = False
+        self.counters = collections.defaultdict(int)
+        self.histograms = collections.defaultdict(Histogram)
+
+    def enable(self, path=None):
+        self.enabled = True
+        if path:
+            atexit.register(self.dump, path.format(pid=os.getpid()))
+
+    def inc(self, name, value=1):
+        if self.enabled:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        if self.enabled:
+            self.histograms[name].observe(value)
+
+    # Uso: with METRICS.time('ai.decisionMs'): ...
+    def time(self, name):
+        if self.enabled:
+            return Timer(self.histograms[name])
+        return NULL_TIMER
+
+    def toDict(self):
+        return {
+            'counters': dict(self.counters),
+            'histograms': {name: histogram.toDict() for name, histogram in self.histograms.items()},
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.toDict(), f, indent=2)
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    # Devuelve lo registrado desde la última llamada (o None si el registro está desactivado) y lo borra. Se usa en los
+    # procesos de un grupo para mandar sus métricas al proceso principal.
+    def drain(self):
+        if not self.enabled:
+            return None
+        state = {
+            'counters': dict(self.counters),
+            'histograms': {name: histogram.getState() for name, histogram in self.histograms.items()},
+        }
+        self.reset()
+        return state
+
+    # Suma al registro lo que devolvió drain() en otro proceso.
+    def merge(self, state):
+        if not self.enabled or not state:
+            return
+        for name, value in state['counters'].items():
+            self.counters[name] += value
+        for name, histogram in state['histograms'].items():
+            self.histograms[name].merge(histogram)
+
+
+METRICS = MetricsRegistry()
+
+
+# Inicializador para los procesos de un multiprocessing.Pool: un proceso creado con fork hereda lo que el principal ya
+# había registrado, que no debe volver a sumarse.
+def initWorkerMetrics():
+    METRICS.reset()
+
+if os.environ.get('TETRIS_METRICS'):
+    METRICS.enable(os.environ['TETRIS_METRICS'])
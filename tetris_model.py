@@ -1,5 +1,8 @@
+import copy
 import random
 
+from tetris_trace import traced
+
 # Clase que define las constantes y coordenadas para las diferentes formas que se encuentran en el Juego de Tetris, 
 # donde cada forma tiene asignado un número único y un conjunto de coordenadas que define su posición en la cuadrícula del juego.
 class Shape(object):
@@ -27,192 +30,190 @@ class Shape(object):
     def __init__(self, shape=0):
         self.shape = shape
 
-    # Este método calcula y devuelve las coordenadas rotadas para una forma específica en el juego de Tetris, dependiendo de la dirección de la rotación
+    # Este método devuelve las coordenadas rotadas para una forma específica en el juego de Tetris, dependiendo de la dirección de la rotación.
+    # Los valores se leen de SHAPE_GEOMETRY, que se calcula una sola vez al importar el módulo.
     def getRotatedOffsets(self, direction):
-        tmpCoords = Shape.shapeCoord[self.shape]
-        if direction == 0 or self.shape == Shape.shapeO:
-            return ((x, y) for x, y in tmpCoords)
-
-        if direction == 1:
-            return ((-y, x) for x, y in tmpCoords)
-
-        if direction == 2:
-            if self.shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
-                return ((x, y) for x, y in tmpCoords)
-            else:
-                return ((-x, -y) for x, y in tmpCoords)
-
-        if direction == 3:
-            if self.shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
-                return ((-y, x) for x, y in tmpCoords)
-            else:
-                return ((y, -x) for x, y in tmpCoords)
+        return SHAPE_GEOMETRY[self.shape][direction].offsets
 
     def getCoords(self, direction, x, y):
-        return ((x + xx, y + yy) for xx, yy in self.getRotatedOffsets(direction))
+        return [(x + xx, y + yy) for xx, yy in SHAPE_GEOMETRY[self.shape][direction].offsets]
 
     def getBoundingOffsets(self, direction):
-        tmpCoords = self.getRotatedOffsets(direction)
-        minX, maxX, minY, maxY = 0, 0, 0, 0
-        for x, y in tmpCoords:
-            if minX > x:
-                minX = x
-            if maxX < x:
-                maxX = x
-            if minY > y:
-                minY = y
-            if maxY < y:
-                maxY = y
-        return (minX, maxX, minY, maxY)
-
-
-class BoardData(object):
-    width = 10
-    height = 22
-
-    def __init__(self):
-        self.backBoard = [0] * BoardData.width * BoardData.height
-
-        self.currentX = -1
-        self.currentY = -1
-        self.currentDirection = 0
-        self.currentShape = Shape()
-        self.nextShape = Shape(random.randint(1, 7))
+        return SHAPE_GEOMETRY[self.shape][direction].bounds
 
-        self.shapeStat = [0] * 8
+    # Devuelve las rotaciones que producen posiciones distintas (por ejemplo, la O solo tiene una y la I, S y Z tienen dos).
+    def getRotations(self):
+        return SHAPE_ROTATIONS[self.shape]
 
-    def getData(self):
-        return self.backBoard[:]
 
-    def getValue(self, x, y):
-        return self.backBoard[x + y * BoardData.width]
+# Calcula las coordenadas rotadas de una forma según la dirección de la rotación. Solo se usa para construir SHAPE_GEOMETRY.
+def calcRotatedOffsets(shape, direction):
+    tmpCoords = Shape.shapeCoord[shape]
+    if direction == 0 or shape == Shape.shapeO:
+        return tuple((x, y) for x, y in tmpCoords)
 
-    def getCurrentShapeCoord(self):
-        return self.currentShape.getCoords(self.currentDirection, self.currentX, self.currentY)
+    if direction == 1:
+        return tuple((-y, x) for x, y in tmpCoords)
 
-    def createNewPiece(self):
-        minX, maxX, minY, maxY = self.nextShape.getBoundingOffsets(0)
-        result = False
-        if self.tryMoveCurrent(0, 5, -minY):
-            self.currentX = 5
-            self.currentY = -minY
-            self.currentDirection = 0
-            self.currentShape = self.nextShape
-            self.nextShape = Shape(random.randint(1, 7))
-            result = True
+    if direction == 2:
+        if shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
+            return tuple((x, y) for x, y in tmpCoords)
         else:
-            self.currentShape = Shape()
-            self.currentX = -1
-            self.currentY = -1
-            self.currentDirection = 0
-            result = False
-        self.shapeStat[self.currentShape.shape] += 1
-        return result
-
-    def tryMoveCurrent(self, direction, x, y):
-        return self.tryMove(self.currentShape, direction, x, y)
+            return tuple((-x, -y) for x, y in tmpCoords)
 
-    def tryMove(self, shape, direction, x, y):
-        for x, y in shape.getCoords(direction, x, y):
-            if x >= BoardData.width or x < 0 or y >= BoardData.height or y < 0:
-                return False
-            if self.backBoard[x + y * BoardData.width] > 0:
-                return False
-        return True
-
-    def moveDown(self):
-        lines = 0
-        if self.tryMoveCurrent(self.currentDirection, self.currentX, self.currentY + 1):
-            self.currentY += 1
+    if direction == 3:
+        if shape in (Shape.shapeI, Shape.shapeZ, Shape.shapeS):
+            return tuple((-y, x) for x, y in tmpCoords)
         else:
-            self.mergePiece()
-            lines = self.removeFullLines()
-            self.createNewPiece()
-        return lines
-
-    def dropDown(self):
-        while self.tryMoveCurrent(self.currentDirection, self.currentX, self.currentY + 1):
-            self.currentY += 1
-        self.mergePiece()
-        lines = self.removeFullLines()
-        self.createNewPiece()
-        return lines
-
-    def moveLeft(self):
-        if self.tryMoveCurrent(self.currentDirection, self.currentX - 1, self.currentY):
-            self.currentX -= 1
-
-    def moveRight(self):
-        if self.tryMoveCurrent(self.currentDirection, self.currentX + 1, self.currentY):
-            self.currentX += 1
+            return tuple((y, -x) for x, y in tmpCoords)
 
-    def rotateRight(self):
-        if self.tryMoveCurrent((self.currentDirection + 1) % 4, self.currentX, self.currentY):
-            self.currentDirection += 1
-            self.currentDirection %= 4
 
-    def rotateLeft(self):
-        if self.tryMoveCurrent((self.currentDirection - 1) % 4, self.currentX, self.currentY):
-            self.currentDirection -= 1
-            self.currentDirection %= 4
+# Geometría precalculada de una forma en una rotación concreta:
+# - offsets: coordenadas relativas de los cuatro bloques.
+# - bounds: caja envolvente (minX, maxX, minY, maxY), que siempre incluye el origen.
+# - rowMasks: ((dy, máscara), ...) por fila, con la máscara alineada para que la columna minX sea el bit 0.
+# - bottoms: ((dx, dy), ...) con el bloque más bajo de cada columna que ocupa la pieza.
+class ShapeGeometry(object):
+    __slots__ = ('offsets', 'bounds', 'rowMasks', 'bottoms')
 
-    def removeFullLines(self):
-        newBackBoard = [0] * BoardData.width * BoardData.height
-        newY = BoardData.height - 1
-        lines = 0
-        for y in range(BoardData.height - 1, -1, -1):
-            blockCount = sum([1 if self.backBoard[x + y * BoardData.width] > 0 else 0 for x in range(BoardData.width)])
-            if blockCount < BoardData.width:
-                for x in range(BoardData.width):
-                    newBackBoard[x + newY * BoardData.width] = self.backBoard[x + y * BoardData.width]
-                newY -= 1
-            else:
-                lines += 1
-        if lines > 0:
-            self.backBoard = newBackBoard
-        return lines
+    def __init__(self, shape, direction):
+        self.offsets = calcRotatedOffsets(shape, direction)
 
-    def mergePiece(self):
-        for x, y in self.currentShape.getCoords(self.currentDirection, self.currentX, self.currentY):
-            self.backBoard[x + y * BoardData.width] = self.currentShape.shape
+        minX, maxX, minY, maxY = 0, 0, 0, 0
+        for x, y in self.offsets:
+            minX, maxX = min(minX, x), max(maxX, x)
+            minY, maxY = min(minY, y), max(maxY, y)
+        self.bounds = (minX, maxX, minY, maxY)
 
-        self.currentX = -1
-        self.currentY = -1
-        self.currentDirection = 0
-        self.currentShape = Shape()
+        rows = {}
+        bottoms = {}
+        for x, y in self.offsets:
+            rows[y] = rows.get(y, 0) | (1 << (x - minX))
+            bottoms[x] = max(bottoms.get(x, y), y)
+        self.rowMasks = tuple(sorted(rows.items()))
+        self.bottoms = tuple(sorted(bottoms.items()))
 
-    def clear(self):
-        self.currentX = -1
-        self.currentY = -1
-        self.currentDirection = 0
-        self.currentShape = Shape()
-        self.backBoard = [0] * BoardData.width * BoardData.height
 
+# Tablas indexadas por [forma][dirección] y por [forma], construidas una sola vez al importar el módulo.
+SHAPE_GEOMETRY = tuple(tuple(ShapeGeometry(shape, direction) for direction in range(4))
+                       for shape in range(len(Shape.shapeCoord)))
 
-BOARD_DATA = BoardData()
+# Rotaciones canónicas de cada forma: se descartan las rotaciones que repiten el mismo conjunto de bloques.
+SHAPE_ROTATIONS = tuple(
+    tuple(direction for direction in range(4)
+          if all(set(rotations[direction].offsets) != set(rotations[d].offsets) for d in range(direction)))
+    for rotations in SHAPE_GEOMETRY
+)
 
 
-class BoardData1(object):
+class BoardData(object):
     width = 10
     height = 22
-
-    def __init__(self):
+    fullRowMask = (1 << width) - 1  # Máscara de una fila completa: un bit por columna.
+
+    # Además de backBoard (que guarda el color de cada celda), se mantiene un bitboard en rowMasks donde cada fila
+    # es un entero de 10 bits; el bit x indica que la celda (x, y) está ocupada. Las colisiones y las líneas completas se
+    # resuelven con operaciones de bits sobre esas máscaras en lugar de recorrer celda por celda.
+    # También se mantienen al día, en mergePiece y removeFullLines, la altura y la cantidad de bloques de cada columna
+    # y la cantidad de bloques de cada fila.
+    # rng es el generador de piezas (por defecto el módulo random); una instancia de random.Random con semilla
+    # permite repetir exactamente la misma secuencia de piezas.
+    # preview es la cola de las próximas previewSize piezas; nextShape es la primera de la cola.
+    def __init__(self, rng=None, previewSize=1):
+        self.rng = random if rng is None else rng
         self.backBoard = [0] * BoardData.width * BoardData.height
+        self.rowMasks = [0] * BoardData.height
+        self.columnHeights = [0] * BoardData.width
+        self.columnBlocks = [0] * BoardData.width
+        self.rowFill = [0] * BoardData.height
 
         self.currentX = -1
         self.currentY = -1
         self.currentDirection = 0
         self.currentShape = Shape()
-        self.nextShape = Shape(random.randint(1, 7))
+        self.preview = [Shape(self.rng.randint(1, 7)) for _ in range(previewSize)]
 
         self.shapeStat = [0] * 8
 
+        self.shownBackBoard = None  # Celdas del último cuadro pintado (None: todavía no se pintó ninguno).
+        self.shownPiece = (Shape.shapeNone, frozenset())  # Forma y celdas de la pieza actual en ese cuadro.
+
+    @property
+    def nextShape(self):
+        return self.preview[0]
+
+    @nextShape.setter
+    def nextShape(self, shape):
+        self.preview[0] = shape
+
+    # Copia independiente del tablero y de sus piezas, para calcular jugadas en otro hilo mientras el juego sigue.
+    def snapshot(self):
+        other = copy.copy(self)
+        other.backBoard = self.backBoard[:]
+        other.rowMasks = self.rowMasks[:]
+        other.columnHeights = self.columnHeights[:]
+        other.columnBlocks = self.columnBlocks[:]
+        other.rowFill = self.rowFill[:]
+        other.shapeStat = self.shapeStat[:]
+        other.preview = self.preview[:]
+        return other
+
     def getData(self):
         return self.backBoard[:]
 
+    def getRowMasks(self):
+        return self.rowMasks[:]
+
     def getValue(self, x, y):
         return self.backBoard[x + y * BoardData.width]
 
+    # Altura de cada columna medida desde el fondo hasta su bloque más alto (0 si la columna está vacía).
+    def getColumnHeights(self):
+        return self.columnHeights[:]
+
+    # Cantidad de celdas vacías que quedan por debajo del bloque más alto de cada columna.
+    def getHoleCounts(self):
+        return [height - blocks for height, blocks in zip(self.columnHeights, self.columnBlocks)]
+
+    # Cantidad de bloques de cada fila, de arriba hacia abajo.
+    def getRowFill(self):
+        return self.rowFill[:]
+
+    # Distancia que cae una pieza soltada desde y = 0 en la columna x, calculada con las alturas de columna.
+    def getDropDist(self, shape, direction, x):
+        return calcDropDist(self.columnHeights, shape, direction, x)
+
+    # Devuelve las zonas del tablero que cambiaron desde la llamada anterior como rectángulos (x, y, ancho, alto) en
+    # celdas, o None si hay que pintar todo (la primera vez). Compara las celdas con las del cuadro anterior fila por
+    # fila (sin registrar nada en los métodos que modifican el tablero) y agrega las celdas por las que se movió la
+    # pieza actual. Está pensado para un solo consumidor, el widget que pinta el tablero.
+    def takeDirtyRegion(self):
+        width = BoardData.width
+        piece = (Shape.shapeNone, frozenset())
+        if self.currentShape.shape != Shape.shapeNone:
+            piece = (self.currentShape.shape, frozenset(self.getCurrentShapeCoord()))
+        shown, shownPiece = self.shownBackBoard, self.shownPiece
+        self.shownBackBoard = self.backBoard[:]
+        self.shownPiece = piece
+        if shown is None:
+            return None
+
+        rects = []
+        for y in range(BoardData.height):
+            start = y * width
+            if shown[start:start + width] != self.backBoard[start:start + width]:
+                changed = [x for x in range(width) if shown[start + x] != self.backBoard[start + x]]
+                rects.append((changed[0], y, changed[-1] - changed[0] + 1, 1))
+        if piece != shownPiece:
+            # Si la forma no cambió solo hay que pintar las celdas que la pieza dejó o empezó a ocupar.
+            cells = piece[1] ^ shownPiece[1] if piece[0] == shownPiece[0] else piece[1] | shownPiece[1]
+            rects.extend((x, y, 1, 1) for x, y in cells)
+        return rects
+
+    # Próximas piezas, en el orden en que van a salir.
+    def getPreview(self):
+        return self.preview[:]
+
     def getCurrentShapeCoord(self):
         return self.currentShape.getCoords(self.currentDirection, self.currentX, self.currentY)
 
@@ -223,8 +224,8 @@ class BoardData1(object):
             self.currentX = 5
             self.currentY = -minY
             self.currentDirection = 0
-            self.currentShape = self.nextShape
-            self.nextShape = Shape(random.randint(1, 7))
+            self.currentShape = self.preview.pop(0)
+            self.preview.append(Shape(self.rng.randint(1, 7)))
             result = True
         else:
             self.currentShape = Shape()
@@ -238,14 +239,21 @@ class BoardData1(object):
     def tryMoveCurrent(self, direction, x, y):
         return self.tryMove(self.currentShape, direction, x, y)
 
+    # Comprueba la colisión con el bitboard: primero los límites del tablero con la caja de la pieza y luego,
+    # por cada fila de la pieza, un desplazamiento y un AND contra la máscara de la fila correspondiente.
     def tryMove(self, shape, direction, x, y):
-        for x, y in shape.getCoords(direction, x, y):
-            if x >= BoardData.width or x < 0 or y >= BoardData.height or y < 0:
-                return False
-            if self.backBoard[x + y * BoardData.width] > 0:
+        geometry = SHAPE_GEOMETRY[shape.shape][direction]
+        minX, maxX, minY, maxY = geometry.bounds
+        if x + minX < 0 or x + maxX >= BoardData.width or y + minY < 0 or y + maxY >= BoardData.height:
+            return False
+        rowMasks = self.rowMasks
+        shift = x + minX
+        for dy, mask in geometry.rowMasks:
+            if rowMasks[y + dy] & (mask << shift):
                 return False
         return True
 
+    @traced('BoardData.moveDown')
     def moveDown(self):
         lines = 0
         if self.tryMoveCurrent(self.currentDirection, self.currentX, self.currentY + 1):
@@ -264,6 +272,26 @@ class BoardData1(object):
         self.createNewPiece()
         return lines
 
+    # Coloca la pieza actual en la rotación y columna indicadas y la suelta. Si la posición no está libre a la altura
+    # actual, se intenta llegar con rotaciones y desplazamientos de una celda, como lo haría un jugador.
+    def dropDownAt(self, direction, x):
+        if self.tryMoveCurrent(direction, x, self.currentY):
+            self.currentDirection = direction
+            self.currentX = x
+        else:
+            k = 0
+            while self.currentDirection != direction and k < 4:
+                self.rotateRight()
+                k += 1
+            k = 0
+            while self.currentX != x and k < BoardData.width:
+                if self.currentX > x:
+                    self.moveLeft()
+                else:
+                    self.moveRight()
+                k += 1
+        return self.dropDown()
+
     def moveLeft(self):
         if self.tryMoveCurrent(self.currentDirection, self.currentX - 1, self.currentY):
             self.currentX -= 1
@@ -282,36 +310,163 @@ class BoardData1(object):
             self.currentDirection -= 1
             self.currentDirection %= 4
 
+    # Una fila está completa cuando su máscara es igual a fullRowMask. Las filas que se conservan se copian en orden
+    # y se rellenan por arriba con tantas filas vacías como líneas se hayan eliminado.
+    @traced('BoardData.removeFullLines')
     def removeFullLines(self):
-        newBackBoard = [0] * BoardData.width * BoardData.height
-        newY = BoardData.height - 1
-        lines = 0
-        for y in range(BoardData.height - 1, -1, -1):
-            blockCount = sum([1 if self.backBoard[x + y * BoardData.width] > 0 else 0 for x in range(BoardData.width)])
-            if blockCount < BoardData.width:
-                for x in range(BoardData.width):
-                    newBackBoard[x + newY * BoardData.width] = self.backBoard[x + y * BoardData.width]
-                newY -= 1
-            else:
-                lines += 1
+        width = BoardData.width
+        keptRows = [y for y, mask in enumerate(self.rowMasks) if mask != BoardData.fullRowMask]
+        lines = BoardData.height - len(keptRows)
         if lines > 0:
+            newBackBoard = [0] * width * lines
+            for y in keptRows:
+                newBackBoard.extend(self.backBoard[y * width:(y + 1) * width])
             self.backBoard = newBackBoard
+            self.rowMasks = [0] * lines + [self.rowMasks[y] for y in keptRows]
+            self.rowFill = [0] * lines + [self.rowFill[y] for y in keptRows]
+            # Cada línea completa tenía un bloque en cada columna; las alturas se recalculan desde las máscaras.
+            self.columnBlocks = [blocks - lines for blocks in self.columnBlocks]
+            self.columnHeights = calcColumnHeights(self.rowMasks)
         return lines
 
     def mergePiece(self):
+        # Después del fin del juego no hay pieza actual (forma vacía en -1, -1) y no hay nada que fijar; sus coordenadas
+        # darían un desplazamiento negativo en rowMasks.
+        if self.currentShape.shape == Shape.shapeNone:
+            return
         for x, y in self.currentShape.getCoords(self.currentDirection, self.currentX, self.currentY):
             self.backBoard[x + y * BoardData.width] = self.currentShape.shape
+            if not self.rowMasks[y] >> x & 1:  # Una pieza que aparece sobre bloques (fin del juego) no suma celdas ya ocupadas.
+                self.rowMasks[y] |= 1 << x
+                self.rowFill[y] += 1
+                self.columnBlocks[x] += 1
+            if self.columnHeights[x] < BoardData.height - y:
+                self.columnHeights[x] = BoardData.height - y
 
         self.currentX = -1
         self.currentY = -1
         self.currentDirection = 0
         self.currentShape = Shape()
 
+    # Coloca una pieza en el tablero sin copiarlo: la suelta desde y = 0 en (direction, x), la fija y, si clearLines es
+    # verdadero, elimina las líneas completas. No toca la pieza actual. Devuelve un registro con las celdas, las alturas
+    # de columna y las filas eliminadas para restaurar el tablero con undoPiece, o None si la pieza no cabe.
+    def placePiece(self, shape, direction, x, clearLines=True):
+        width = BoardData.width
+        dist = self.getDropDist(shape, direction, x)
+        cells = shape.getCoords(direction, x, dist)
+        if dist + SHAPE_GEOMETRY[shape.shape][direction].bounds[2] < 0:
+            return None
+        oldHeights = [(x + dx, self.columnHeights[x + dx]) for dx, _ in SHAPE_GEOMETRY[shape.shape][direction].bottoms]
+        for cx, cy in cells:
+            self.backBoard[cx + cy * width] = shape.shape
+            self.rowMasks[cy] |= 1 << cx
+            self.rowFill[cy] += 1
+            self.columnBlocks[cx] += 1
+            if self.columnHeights[cx] < BoardData.height - cy:
+                self.columnHeights[cx] = BoardData.height - cy
+
+        clearedRows = []
+        if clearLines:
+            clearedRows = [(y, self.backBoard[y * width:(y + 1) * width])
+                           for y, mask in enumerate(self.rowMasks) if mask == BoardData.fullRowMask]
+            if clearedRows:
+                self.removeFullLines()
+        return (cells, oldHeights, clearedRows)
+
+    # Deshace una llamada a placePiece con su registro. Los registros se deben deshacer en orden inverso.
+    def undoPiece(self, record):
+        width = BoardData.width
+        cells, oldHeights, clearedRows = record
+        if clearedRows:
+            # Vuelve a insertar las filas eliminadas en su posición original.
+            lines = len(clearedRows)
+            keptBack = self.backBoard[lines * width:]
+            keptMasks = self.rowMasks[lines:]
+            keptFill = self.rowFill[lines:]
+            backBoard, rowMasks, rowFill = [], [], []
+            cleared = dict(clearedRows)
+            k = 0
+            for y in range(BoardData.height):
+                if y in cleared:
+                    backBoard.extend(cleared[y])
+                    rowMasks.append(BoardData.fullRowMask)
+                    rowFill.append(width)
+                else:
+                    backBoard.extend(keptBack[k * width:(k + 1) * width])
+                    rowMasks.append(keptMasks[k])
+                    rowFill.append(keptFill[k])
+                    k += 1
+            self.backBoard = backBoard
+            self.rowMasks = rowMasks
+            self.rowFill = rowFill
+            self.columnBlocks = [blocks + lines for blocks in self.columnBlocks]
+
+        for cx, cy in cells:
+            self.backBoard[cx + cy * width] = 0
+            self.rowMasks[cy] &= ~(1 << cx)
+            self.rowFill[cy] -= 1
+            self.columnBlocks[cx] -= 1
+        if clearedRows:
+            self.columnHeights = calcColumnHeights(self.rowMasks)
+        else:
+            for cx, height in oldHeights:
+                self.columnHeights[cx] = height
+
+    # Reemplaza el contenido del tablero por las máscaras de fila dadas y recalcula alturas y cantidades de bloques.
+    # Las máscaras no guardan colores, así que las celdas ocupadas quedan con el valor fill.
+    def loadRowMasks(self, rowMasks, fill=1):
+        width = BoardData.width
+        self.rowMasks = [int(mask) for mask in rowMasks]
+        self.backBoard = [fill if mask >> x & 1 else 0 for mask in self.rowMasks for x in range(width)]
+        self.rowFill = [bin(mask).count('1') for mask in self.rowMasks]
+        self.columnBlocks = [sum(mask >> x & 1 for mask in self.rowMasks) for x in range(width)]
+        self.columnHeights = calcColumnHeights(self.rowMasks)
+
     def clear(self):
         self.currentX = -1
         self.currentY = -1
         self.currentDirection = 0
         self.currentShape = Shape()
         self.backBoard = [0] * BoardData.width * BoardData.height
+        self.rowMasks = [0] * BoardData.height
+        self.columnHeights = [0] * BoardData.width
+        self.columnBlocks = [0] * BoardData.width
+        self.rowFill = [0] * BoardData.height
+
+
+# Calcula la altura de cada columna recorriendo las máscaras de fila de arriba hacia abajo.
+def calcColumnHeights(rowMasks):
+    heights = [0] * BoardData.width
+    seen = 0
+    for y, mask in enumerate(rowMasks):
+        found = mask & ~seen
+        if found:
+            for x in range(BoardData.width):
+                if found >> x & 1:
+                    heights[x] = BoardData.height - y
+            seen |= found
+            if seen == BoardData.fullRowMask:
+                break
+    return heights
+
+
+# Distancia que cae una pieza soltada desde y = 0 en la columna x: cada columna de la pieza se detiene justo encima
+# del bloque más alto de esa columna, y la pieza cae lo que permita la columna más restrictiva.
+def calcDropDist(columnHeights, shape, direction, x):
+    dist = BoardData.height - 1
+    for dx, dy in SHAPE_GEOMETRY[shape.shape][direction].bottoms:
+        columnDist = BoardData.height - columnHeights[x + dx] - 1 - dy
+        if columnDist < dist:
+            dist = columnDist
+    return dist
+
+
+# Tablero global que usan por defecto las ventanas y TetrisAI cuando no reciben uno. Cada partida independiente
+# (simulaciones, varias ventanas en un mismo proceso) debe crear su propio BoardData.
+BOARD_DATA = BoardData()
+
 
-BOARD_DATA1 = BoardData1()
\ No newline at end of file
+# Nombres anteriores de la copia de BoardData, que ahora es la misma clase. BOARD_DATA1 sigue siendo un tablero aparte.
+BoardData1 = BoardData
+BOARD_DATA1 = BoardData()
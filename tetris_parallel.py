@@ -0,0 +1,122 @@
+# Búsqueda de jugadas repartida entre procesos. Las raíces (d0, x0) de nextMove se dividen entre los procesos de un grupo;
+# cada proceso expande y puntúa sus subárboles con su propio TetrisAI y el proceso principal se queda con el mejor.
+# El tablero no viaja en cada pedido: se escribe en un bloque de multiprocessing.shared_memory que los procesos leen
+# directamente, y cada pedido solo lleva el número de versión del tablero y las raíces que le tocan.
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from tetris_model import BoardData, Shape
+from tetris_ai import TetrisAI
+from tetris_metrics import METRICS, initWorkerMetrics
+
+MAX_PREVIEW = 8  # Máximo de piezas de la cola de próximas piezas que se copian al bloque compartido.
+HEADER_SIZE = 3 + MAX_PREVIEW  # Versión, pieza actual, cantidad de próximas piezas y las próximas piezas.
+
+# Estado de cada proceso del grupo: el bloque compartido, la copia local del tablero y su TetrisAI.
+workerState = {}
+
+
+# Vista int64 del bloque compartido: la cabecera seguida de las máscaras de fila del tablero.
+def sharedArray(shm):
+    return np.ndarray((HEADER_SIZE + BoardData.height,), dtype=np.int64, buffer=shm.buf)
+
+
+# Inicializa un proceso del grupo: se conecta al bloque compartido y crea su propio tablero y su propio TetrisAI.
+def initWorker(name, cacheSize):
+    shm = shared_memory.SharedMemory(name=name)
+    boardData = BoardData()
+    workerState['shm'] = shm
+    workerState['array'] = sharedArray(shm)
+    workerState['ai'] = TetrisAI(boardData, cacheSize)
+    workerState['version'] = None
+    initWorkerMetrics()
+
+
+# Puntúa las raíces de un pedido. Si el tablero compartido cambió desde el pedido anterior, primero lo vuelve a leer.
+# Devuelve [(índice de la raíz, mejor puntuación o None)] y las métricas registradas en el proceso (ver METRICS.drain).
+def scoreRootsTask(task):
+    version, roots, speculating = task
+    ai = workerState['ai']
+    ai.speculating = speculating
+    if workerState['version'] != version:
+        array = workerState['array']
+        boardData = ai.boardData
+        boardData.loadRowMasks(array[HEADER_SIZE:])
+        boardData.currentShape = Shape(int(array[1]))
+        boardData.preview = [Shape(int(shape)) for shape in array[3:3 + int(array[2])]]
+        workerState['version'] = version
+    indices = [index for index, _ in roots]
+    return list(zip(indices, ai.scoreRoots([root for _, root in roots]))), METRICS.drain()
+
+
+# TetrisAI que reparte la búsqueda completa de dos piezas entre processes procesos (todos los núcleos por defecto).
+# La búsqueda en haz y la búsqueda con límite de tiempo se siguen haciendo en el proceso principal.
+# Hay que llamar a close() al terminar (o usarlo en un bloque with) para cerrar los procesos y liberar el bloque compartido.
+class ParallelTetrisAI(TetrisAI):
+    def __init__(self, boardData=None, cacheSize=50000, depth=2, beamWidth=None, processes=None):
+        super().__init__(boardData, cacheSize, depth, beamWidth)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.shm = shared_memory.SharedMemory(create=True, size=(HEADER_SIZE + BoardData.height) * 8)
+        self.array = sharedArray(self.shm)
+        self.array[:] = 0
+        self.version = 0
+        self.pool = multiprocessing.Pool(self.processes, initWorker, (self.shm.name, cacheSize))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.array = None
+            self.shm.close()
+            self.shm.unlink()
+
+    # Copia el tablero y las piezas al bloque compartido con un número de versión nuevo.
+    def publishBoard(self):
+        boardData = self.boardData
+        preview = boardData.preview[:MAX_PREVIEW]
+        self.version += 1
+        self.array[0] = self.version
+        self.array[1] = boardData.currentShape.shape
+        self.array[2] = len(preview)
+        self.array[3:3 + len(preview)] = [shape.shape for shape in preview]
+        self.array[HEADER_SIZE:] = boardData.rowMasks
+
+    def searchMove(self, timeBudget=None):
+        if self.beamWidth is not None or timeBudget is not None or self.pool is None:
+            return super().searchMove(timeBudget)
+        return self.nextMoveParallel()
+
+    # Reparte las raíces de forma intercalada (la raíz i va al pedido i % processes) para equilibrar la carga, y
+    # combina los resultados como la búsqueda secuencial: mayor puntuación y, en caso de empate, la primera raíz.
+    def nextMoveParallel(self):
+        boardData = self.boardData
+        if boardData.currentShape.shape == Shape.shapeNone:
+            return None
+        roots = []
+        for d0 in boardData.currentShape.getRotations():
+            minX, maxX, _, _ = boardData.currentShape.getBoundingOffsets(d0)
+            for x0 in range(-minX, boardData.width - maxX):
+                roots.append((len(roots), (d0, x0)))
+
+        self.publishBoard()
+        tasks = [(self.version, roots[k::self.processes], self.speculating) for k in range(min(self.processes, len(roots)))]
+        bestScore, bestRoot = None, None
+        for results, metrics in self.pool.imap_unordered(scoreRootsTask, tasks):
+            METRICS.merge(metrics)
+            for i, score in results:
+                if score is not None and (bestScore is None or score > bestScore or (score == bestScore and i < bestRoot)):
+                    bestScore, bestRoot = score, i
+        if bestRoot is None:
+            return None
+        d0, x0 = roots[bestRoot][1]
+        return (d0, x0, bestScore)
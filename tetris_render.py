@@ -0,0 +1,89 @@
+# Caché de dibujo compartida por las ventanas del juego. Cada cuadrado con bordes claros y oscuros se dibuja una sola
+# vez por color y tamaño de cuadrícula en un QPixmap (una baldosa) y después se copia con drawPixmap, en lugar de crear
+# el QColor, calcular lighter()/darker() y hacer un fillRect y cuatro drawLine por cada celda en cada repintado.
+import numpy as np
+from PyQt5 import sip
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
+
+COLOR_TABLE = [0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
+               0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00]
+
+
+# Dibuja el cuadrado de color val y lado s con su esquina en (x, y): el relleno y los bordes claros arriba e izquierda
+# y oscuros abajo y derecha, para darle una apariencia tridimensional.
+def paintSquare(painter, x, y, val, s):
+    color = QColor(COLOR_TABLE[val])
+    painter.fillRect(x + 1, y + 1, s - 2, s - 2, color)
+
+    painter.setPen(color.lighter())
+    painter.drawLine(x, y + s - 1, x, y)
+    painter.drawLine(x, y, x + s - 1, y)
+
+    painter.setPen(color.darker())
+    painter.drawLine(x + 1, y + s - 1, x + s - 1, y + s - 1)
+    painter.drawLine(x + s - 1, y + s - 1, x + s - 1, y + 1)
+
+
+# Baldosas ya dibujadas, una por color, para el tamaño de cuadrícula gridSize. Si se pide otro tamaño se descartan
+# todas y se vuelven a dibujar con el nuevo.
+class TileCache(object):
+    def __init__(self):
+        self.gridSize = None
+        self.tiles = {}
+
+    def getTile(self, val, gridSize):
+        if gridSize != self.gridSize:
+            self.tiles = {}
+            self.gridSize = gridSize
+        tile = self.tiles.get(val)
+        if tile is None:
+            tile = QPixmap(gridSize, gridSize)
+            tile.fill(Qt.transparent)
+            painter = QPainter(tile)
+            paintSquare(painter, 0, 0, val, gridSize)
+            painter.end()
+            self.tiles[val] = tile
+        return tile
+
+
+TILE_CACHE = TileCache()
+
+
+# Copia la baldosa del color val y lado s en (x, y). Las coordenadas se truncan a enteros, como en drawSquare1.
+def drawTile(painter, x, y, val, s):
+    if val == 0:
+        return
+    painter.drawPixmap(int(x), int(y), TILE_CACHE.getTile(val, int(s)))
+
+
+# Alternativa a dibujar celda por celda: un arreglo uint8 con el índice de color de cada celda (el tablero y la pieza
+# actual) envuelto sin copiarlo en una QImage indexada de 8 bits, que se escala al tamaño del tablero con un solo
+# drawImage. El costo de un repintado casi no depende de la cantidad de celdas, pero las celdas son planas (sin bordes).
+# background es el color de las celdas vacías (índice 0).
+class BoardImage(object):
+    def __init__(self, width, height, background=0x000000):
+        self.width = width
+        self.height = height
+        # Las filas de una QImage deben empezar en direcciones múltiplos de 4 bytes.
+        stride = (width + 3) // 4 * 4
+        self.buffer = np.zeros((height, stride), dtype=np.uint8)
+        self.cells = self.buffer[:, :width]
+        # sip.voidptr hace que la QImage use la memoria del arreglo; self.buffer debe vivir mientras se use la imagen.
+        self.image = QImage(sip.voidptr(self.buffer.ctypes.data), width, height, stride, QImage.Format_Indexed8)
+        self.image.setColorTable([0xFF000000 | background] + [0xFF000000 | color for color in COLOR_TABLE[1:]])
+
+    # Copia en el arreglo las celdas de boardData y la pieza actual.
+    def update(self, boardData):
+        self.cells[:] = np.reshape(boardData.backBoard, (self.height, self.width))
+        val = boardData.currentShape.shape
+        for x, y in boardData.getCurrentShapeCoord():
+            if 0 <= x < self.width and 0 <= y < self.height:
+                self.cells[y, x] = val
+
+    # Dibuja la imagen escalada a celdas de lado gridSize desde (0, 0); Qt la recorta a la zona que se repinta.
+    # Escalar una imagen indexada es varias veces más lento que escalar una RGB32, así que antes se convierte (son
+    # solo width * height píxeles).
+    def draw(self, painter, gridSize):
+        painter.drawImage(QRect(0, 0, self.width * gridSize, self.height * gridSize),
+                          self.image.convertToFormat(QImage.Format_RGB32))
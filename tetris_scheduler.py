@@ -0,0 +1,83 @@
+# Reloj de paso fijo para las ventanas del juego. El temporizador de Qt marca cuadros (repintados) y en cada cuadro
+# GameClock indica cuántos pasos de simulación (caídas de una fila) corresponden según el tiempo real transcurrido.
+# Si un cuadro llega tarde se ejecutan los pasos atrasados, hasta maxCatchUp por cuadro; el resto se descarta para que
+# el juego no quede atascado poniéndose al día. La gravedad aumenta con el nivel, que sube cada linesPerLevel líneas.
+import time
+
+from tetris_metrics import METRICS
+
+
+# Intervalo entre caídas, en milisegundos, para el nivel dado: baseMs multiplicado por factor en cada nivel, sin bajar de minMs.
+def gravityInterval(level, baseMs=250, factor=0.85, minMs=20):
+    return max(minMs, baseMs * factor ** level)
+
+
+class GameClock(object):
+    # clock es la función que da el tiempo actual en segundos (time.perf_counter por defecto).
+    def __init__(self, baseMs=250, linesPerLevel=10, maxCatchUp=5, clock=time.perf_counter):
+        self.baseMs = baseMs
+        self.linesPerLevel = linesPerLevel
+        self.maxCatchUp = maxCatchUp
+        self.clock = clock
+        self.level = 0
+        self.stepMs = gravityInterval(0, baseMs)
+        self.reset()
+
+    # Empieza a contar desde ahora, sin pasos pendientes y con las estadísticas en cero. Se usa al iniciar el juego.
+    def reset(self):
+        self.lastTime = self.clock()
+        self.accumulator = 0.0
+        self.ticks = 0
+        self.steps = 0
+        self.lateTicks = 0
+        self.droppedSteps = 0
+        self.maxLagMs = 0.0
+
+    # Descarta el tiempo transcurrido desde el último cuadro sin tocar las estadísticas. Se usa al salir de la pausa.
+    def resync(self):
+        self.lastTime = self.clock()
+        self.accumulator = 0.0
+
+    # Actualiza el nivel (y con él la gravedad) según la cantidad de líneas eliminadas.
+    def setLines(self, lines):
+        level = lines // self.linesPerLevel
+        if level != self.level:
+            self.level = level
+            self.stepMs = gravityInterval(level, self.baseMs)
+
+    def getStepMs(self):
+        return self.stepMs
+
+    # Devuelve cuántos pasos de simulación hay que ejecutar en este cuadro. Un cuadro que debe ejecutar más de un paso
+    # llegó tarde; si los pasos pendientes superan maxCatchUp, se ejecutan maxCatchUp y el resto se descarta.
+    def advance(self):
+        now = self.clock()
+        self.accumulator += (now - self.lastTime) * 1000.0
+        self.lastTime = now
+        self.ticks += 1
+
+        steps = int(self.accumulator // self.stepMs)
+        self.accumulator -= steps * self.stepMs
+        if steps > 1:
+            lagMs = (steps - 1) * self.stepMs + self.accumulator
+            self.lateTicks += 1
+            self.maxLagMs = max(self.maxLagMs, lagMs)
+            METRICS.inc('game.lateTicks')
+            METRICS.observe('game.lagMs', lagMs)
+        if steps > self.maxCatchUp:
+            self.droppedSteps += steps - self.maxCatchUp
+            METRICS.inc('game.droppedSteps', steps - self.maxCatchUp)
+            steps = self.maxCatchUp
+        self.steps += steps
+        return steps
+
+    def getStats(self):
+        return {
+            'ticks': self.ticks,
+            'steps': self.steps,
+            'lateTicks': self.lateTicks,
+            'droppedSteps': self.droppedSteps,
+            'maxLagMs': self.maxLagMs,
+            'level': self.level,
+            'stepMs': self.stepMs,
+        }
@@ -0,0 +1,155 @@
+# Estado del tablero publicado en memoria compartida (multiprocessing.shared_memory), para que otro proceso (la otra
+# ventana o un marcador externo) lo lea sin copiarlo por tuberías ni serializarlo.
+# Cada ventana publica su tablero si se activa con la variable de entorno TETRIS_SHM=prefijo; los bloques se llaman
+# prefijo-humano y prefijo-ia. Para ver el marcador de ambas partidas desde otro proceso:
+#   python tetris_shm.py tetris-humano tetris-ia
+# El bloque es un arreglo int64: un contador de versión, la pieza actual (forma, x, y, rotación), la forma siguiente,
+# los puntos, shapeStat y las celdas del tablero. La escritura sigue el esquema seqlock: el escritor pone la versión en
+# impar, escribe y la pone en par; el lector copia el bloque y lo descarta si la versión era impar o cambió mientras copiaba.
+import argparse
+import atexit
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from tetris_model import BoardData, Shape
+
+VERSION = 0
+CURRENT_SHAPE = 1
+CURRENT_X = 2
+CURRENT_Y = 3
+CURRENT_DIRECTION = 4
+NEXT_SHAPE = 5
+SCORE = 6
+SHAPE_STAT = 7
+CELLS = SHAPE_STAT + 8
+SIZE = CELLS + BoardData.width * BoardData.height
+
+
+# Vista int64 del bloque compartido.
+def sharedArray(shm):
+    return np.ndarray((SIZE,), dtype=np.int64, buffer=shm.buf)
+
+
+# Publica el estado de un tablero en el bloque compartido name. Si quedó un bloque con ese nombre de una ejecución
+# anterior, se reemplaza. El bloque se libera con close() o al salir del programa.
+class BoardPublisher(object):
+    def __init__(self, name):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE * 8)
+        except FileExistsError:
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE * 8)
+        self.array = sharedArray(self.shm)
+        self.array[:] = 0
+        atexit.register(self.close)
+
+    def publish(self, boardData, score):
+        array = self.array
+        if array is None:
+            return
+        array[VERSION] += 1  # Impar: escritura en curso.
+        array[CURRENT_SHAPE] = boardData.currentShape.shape
+        array[CURRENT_X] = boardData.currentX
+        array[CURRENT_Y] = boardData.currentY
+        array[CURRENT_DIRECTION] = boardData.currentDirection
+        array[NEXT_SHAPE] = boardData.nextShape.shape
+        array[SCORE] = score
+        array[SHAPE_STAT:CELLS] = boardData.shapeStat
+        array[CELLS:] = boardData.backBoard
+        array[VERSION] += 1  # Par: estado completo.
+
+    def close(self):
+        if self.array is not None:
+            self.array = None
+            self.shm.close()
+            self.shm.unlink()
+
+
+# Lee el estado publicado por un BoardPublisher en otro proceso. El lector no es dueño del bloque: al salir no lo borra.
+class BoardReader(object):
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.array = sharedArray(self.shm)
+        self.buffer = np.empty(SIZE, dtype=np.int64)
+
+    # Devuelve una copia coherente del bloque (reutilizando el mismo arreglo en cada llamada) o None si después de
+    # maxRetries intentos el escritor seguía cambiándolo.
+    def readArray(self, maxRetries=100):
+        for _ in range(maxRetries):
+            version = int(self.array[VERSION])
+            if version & 1:
+                continue
+            np.copyto(self.buffer, self.array)
+            if int(self.array[VERSION]) == version:
+                return self.buffer
+        return None
+
+    # Devuelve el estado como diccionario, o None (ver readArray).
+    def read(self, maxRetries=100):
+        array = self.readArray(maxRetries)
+        if array is None:
+            return None
+        return {
+            'version': int(array[VERSION]),
+            'currentShape': int(array[CURRENT_SHAPE]),
+            'currentX': int(array[CURRENT_X]),
+            'currentY': int(array[CURRENT_Y]),
+            'currentDirection': int(array[CURRENT_DIRECTION]),
+            'nextShape': int(array[NEXT_SHAPE]),
+            'score': int(array[SCORE]),
+            'shapeStat': array[SHAPE_STAT:CELLS].tolist(),
+            'cells': array[CELLS:].reshape((BoardData.height, BoardData.width)).copy(),
+        }
+
+    # Copia el estado leído en boardData (por ejemplo, el tablero de una ventana espectadora). Devuelve los puntos,
+    # o None si no se pudo leer.
+    def readInto(self, boardData, maxRetries=100):
+        array = self.readArray(maxRetries)
+        if array is None:
+            return None
+        cells = array[CELLS:]
+        boardData.loadRowMasks([int(mask) for mask in (cells.reshape((BoardData.height, BoardData.width)) != 0)
+                                .dot(1 << np.arange(BoardData.width))])
+        boardData.backBoard = cells.tolist()
+        boardData.currentShape = Shape(int(array[CURRENT_SHAPE]))
+        boardData.currentX = int(array[CURRENT_X])
+        boardData.currentY = int(array[CURRENT_Y])
+        boardData.currentDirection = int(array[CURRENT_DIRECTION])
+        boardData.nextShape = Shape(int(array[NEXT_SHAPE]))
+        boardData.shapeStat = array[SHAPE_STAT:CELLS].tolist()
+        return int(array[SCORE])
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+
+
+# Marcador de texto: muestra cada interval segundos las líneas, las piezas y la altura máxima de cada partida publicada.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Marcador de las partidas publicadas en memoria compartida.')
+    parser.add_argument('names', nargs='+', help='nombres de los bloques (por ejemplo tetris-humano tetris-ia)')
+    parser.add_argument('--interval', type=float, default=1.0, help='segundos entre actualizaciones')
+    args = parser.parse_args()
+
+    readers = [(name, BoardReader(name)) for name in args.names]
+    try:
+        while True:
+            parts = []
+            for name, reader in readers:
+                state = reader.read()
+                if state is None:
+                    parts.append("{0}: ocupado".format(name))
+                    continue
+                rows = np.flatnonzero(state['cells'].any(axis=1))
+                height = BoardData.height - rows[0] if len(rows) else 0
+                parts.append("{0}: líneas {1}, piezas {2}, altura {3}".format(
+                    name, state['score'], sum(state['shapeStat']), height))
+            print(" | ".join(parts), flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,78 @@
+# Simulación del Agente Inteligente sin interfaz gráfica. Juega partidas completas sobre BoardData con TetrisAI
+# tan rápido como lo permita el procesador, sin QBasicTimer ni repintados, para evaluar cambios en la I.A.
+import argparse
+import random
+import time
+
+from tetris_model import BoardData, Shape
+from tetris_ai import TetrisAI
+from tetris_metrics import METRICS
+
+
+# Juega una partida hasta que termine, se coloquen maxPieces piezas o pasen timeLimit segundos.
+# Devuelve un diccionario con las líneas, los puntos (100 por línea, como en la ventana del juego), las piezas
+# colocadas, shapeStat y la duración en segundos. Con timeBudget cada decisión de la I.A. dura como máximo esos segundos.
+def playGame(boardData=None, ai=None, maxPieces=None, timeLimit=None, seed=None, timeBudget=None):
+    if boardData is None:
+        boardData = BoardData(random.Random(seed))
+    if ai is None:
+        ai = TetrisAI(boardData)
+
+    boardData.clear()
+    boardData.createNewPiece()
+
+    lines = 0
+    pieces = 0
+    t1 = time.perf_counter()
+    while boardData.currentShape.shape != Shape.shapeNone:
+        if maxPieces is not None and pieces >= maxPieces:
+            break
+        if timeLimit is not None and time.perf_counter() - t1 >= timeLimit:
+            break
+        move = ai.nextMove(timeBudget)
+        if move is None:
+            break
+        cleared = boardData.dropDownAt(move[0], move[1])
+        lines += cleared
+        pieces += 1
+        METRICS.inc('game.lines', cleared)
+
+    return {
+        'lines': lines,
+        'score': lines * 100,
+        'pieces': pieces,
+        'shapeStat': boardData.shapeStat[:],
+        'seconds': time.perf_counter() - t1,
+    }
+
+
+# Permite ejecutar partidas desde la línea de comandos, por ejemplo: python tetris_sim.py --games 5 --pieces 500
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Partidas del Agente Inteligente sin interfaz gráfica.')
+    parser.add_argument('--games', type=int, default=1, help='cantidad de partidas')
+    parser.add_argument('--pieces', type=int, default=None, help='límite de piezas por partida')
+    parser.add_argument('--time', type=float, default=None, help='límite de segundos por partida')
+    parser.add_argument('--seed', type=int, default=None, help='semilla de la primera partida')
+    parser.add_argument('--budget', type=float, default=None, help='milisegundos máximos por decisión de la I.A.')
+    parser.add_argument('--beam', type=int, default=None, help='ancho de la búsqueda en haz (sin él, búsqueda completa de dos piezas)')
+    parser.add_argument('--depth', type=int, default=2, help='piezas que mira la búsqueda en haz, contando la actual')
+    parser.add_argument('--processes', type=int, default=None, help='reparte cada búsqueda completa entre estos procesos')
+    args = parser.parse_args()
+
+    for game in range(args.games):
+        seed = None if args.seed is None else args.seed + game
+        budget = None if args.budget is None else args.budget / 1000.0
+        boardData = BoardData(random.Random(seed), previewSize=max(1, args.depth - 1))
+        if args.processes:
+            from tetris_parallel import ParallelTetrisAI
+            ai = ParallelTetrisAI(boardData, depth=args.depth, beamWidth=args.beam, processes=args.processes)
+        else:
+            ai = TetrisAI(boardData, depth=args.depth, beamWidth=args.beam)
+        try:
+            result = playGame(boardData, ai, maxPieces=args.pieces, timeLimit=args.time, timeBudget=budget)
+        finally:
+            if args.processes:
+                ai.close()
+        print("Partida {0}: líneas {1}, puntos {2}, piezas {3}, {4:.1f} piezas/s".format(
+            game + 1, result['lines'], result['score'], result['pieces'],
+            result['pieces'] / result['seconds'] if result['seconds'] > 0 else 0.0))
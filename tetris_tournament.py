@@ -0,0 +1,71 @@
+# Torneo del Agente Inteligente: juega muchas partidas independientes en paralelo, repartidas en un grupo de procesos,
+# y resume los resultados. Cada partida crea su propio BoardData y su propio TetrisAI dentro del proceso que la juega.
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+
+from tetris_metrics import METRICS, initWorkerMetrics, percentile
+from tetris_sim import playGame
+
+
+# Juega una partida dentro de un proceso del grupo y anota qué proceso la jugó. Devuelve el resultado y las métricas
+# registradas durante la partida (ver METRICS.drain).
+def playTournamentGame(task):
+    seed, maxPieces, timeLimit = task
+    result = playGame(maxPieces=maxPieces, timeLimit=timeLimit, seed=seed)
+    result['seed'] = seed
+    result['worker'] = os.getpid()
+    return result, METRICS.drain()
+
+
+# Resume los resultados: media, mediana y p99 de líneas, y piezas por segundo de cada proceso.
+def summarize(results):
+    lines = [result['lines'] for result in results]
+    workers = {}
+    for result in results:
+        pieces, seconds = workers.get(result['worker'], (0, 0.0))
+        workers[result['worker']] = (pieces + result['pieces'], seconds + result['seconds'])
+    return {
+        'games': len(results),
+        'linesMean': statistics.mean(lines) if lines else 0.0,
+        'linesMedian': statistics.median(lines) if lines else 0.0,
+        'linesP99': percentile(lines, 99),
+        'piecesPerSecond': {str(worker): pieces / seconds if seconds > 0 else 0.0
+                            for worker, (pieces, seconds) in workers.items()},
+    }
+
+
+# Juega games partidas con semillas consecutivas a partir de seed, usando processes procesos (todos los núcleos por defecto).
+def runTournament(games, processes=None, maxPieces=None, timeLimit=None, seed=0):
+    tasks = [(seed + game, maxPieces, timeLimit) for game in range(games)]
+    results = []
+    with multiprocessing.Pool(processes, initWorkerMetrics) as pool:
+        for result, metrics in pool.imap_unordered(playTournamentGame, tasks):
+            METRICS.merge(metrics)
+            results.append(result)
+    results.sort(key=lambda result: result['seed'])
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Torneo de partidas del Agente Inteligente en paralelo.')
+    parser.add_argument('--games', type=int, default=os.cpu_count(), help='cantidad de partidas')
+    parser.add_argument('--processes', type=int, default=None, help='cantidad de procesos (por defecto, todos los núcleos)')
+    parser.add_argument('--pieces', type=int, default=None, help='límite de piezas por partida')
+    parser.add_argument('--time', type=float, default=None, help='límite de segundos por partida')
+    parser.add_argument('--seed', type=int, default=0, help='semilla de la primera partida')
+    parser.add_argument('--output', default=None, help='archivo JSON donde guardar los resultados de cada partida y el resumen')
+    args = parser.parse_args()
+
+    results = runTournament(args.games, args.processes, args.pieces, args.time, args.seed)
+    summary = summarize(results)
+    print("Partidas: {0} | Líneas media: {1:.1f} | mediana: {2:.1f} | p99: {3:.1f}".format(
+        summary['games'], summary['linesMean'], summary['linesMedian'], summary['linesP99']))
+    for worker, rate in sorted(summary['piecesPerSecond'].items()):
+        print("Proceso {0}: {1:.1f} piezas/s".format(worker, rate))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'summary': summary, 'games': results}, f, indent=2)
@@ -0,0 +1,98 @@
+# Trazas opcionales en formato trace_event de Chrome (se abren en chrome://tracing o en Perfetto).
+# Se activan con la variable de entorno TETRIS_TRACE=archivo.json (se admite {pid} en el nombre); al salir del programa
+# se escriben todos los tramos registrados. Desactivadas, span() devuelve un bloque vacío y traced() llama directo.
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+
+# Tramo en curso: al cerrarse agrega un evento completo ("ph": "X") con su inicio y duración en microsegundos.
+class Span(object):
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.addEvent(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+# Bloque with que no hace nada, para cuando las trazas están desactivadas.
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer(object):
+    def __init__(self, maxEvents=1000000):
+        self.enabled = False
+        self.maxEvents = maxEvents
+        self.events = []
+        self.threadNames = {}
+
+    def enable(self, path=None):
+        self.enabled = True
+        if path:
+            atexit.register(self.dump, path.format(pid=os.getpid()))
+
+    # Uso: with TRACER.span('TetrisAI.nextMove', d0=d0): ...
+    def span(self, name, **args):
+        if self.enabled:
+            return Span(self, name, args)
+        return NULL_SPAN
+
+    def addEvent(self, name, start, end, args):
+        if len(self.events) >= self.maxEvents:
+            return
+        tid = threading.get_ident()
+        if tid not in self.threadNames:
+            self.threadNames[tid] = threading.current_thread().name
+        event = {'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': (end - start) * 1e6, 'pid': os.getpid(), 'tid': tid}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def toDict(self):
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                    for tid, name in self.threadNames.items()]
+        return {'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.toDict(), f)
+
+    def reset(self):
+        self.events = []
+        self.threadNames = {}
+
+
+TRACER = Tracer()
+if os.environ.get('TETRIS_TRACE'):
+    TRACER.enable(os.environ['TETRIS_TRACE'])
+
+
+# Decorador que registra cada llamada a la función como un tramo con el nombre indicado.
+def traced(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            with TRACER.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator